@@ -0,0 +1,832 @@
+import asyncio
+import email
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import urllib.parse
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+import requests
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from requests.adapters import HTTPAdapter
+
+import warehub
+import warehub.command
+import warehub.package
+from warehub.arguments import AddArgs
+from warehub.config import Config
+from warehub.database import Database
+from warehub.model import Directory, File, FileName, Project
+from warehub.package import DIST_EXTENSIONS, MAX_FILE_SIZE, MAX_PROJECT_SIZE, MAX_SIG_SIZE, Package, add_package
+from warehub.utils import file_size_str, parse_url
+
+import download_cache
+import generate_site
+import journal_database
+import sqlite_database
+import wheel_metadata
+
+logger = logging.getLogger(warehub.__title__)
+
+CHUNK_SIZE = 1024 * 1024
+
+T = TypeVar('T')
+
+DOWNLOAD_HEADERS = {'Accept': 'application/octet-stream'}
+
+
+@dataclass(frozen=True)
+class AddPackagesArgs(AddArgs):
+    jobs: int = field(
+        metadata={
+            'name_or_flags': ['-j', '--jobs'],
+            'default': 4,
+            'type': int,
+            'required': False,
+            'help': 'The number of repositories to fetch at the same time. [default: 4]',
+        }
+    )
+    pool_size: int = field(
+        metadata={
+            'name_or_flags': ['--pool-size'],
+            'default': 10,
+            'type': int,
+            'required': False,
+            'help': 'The number of connections kept alive to each host. '
+                    'Should be at least the number of jobs, and is raised to '
+                    '--downloads-per-host if lower. [default: 10]',
+        }
+    )
+    timeout: float = field(
+        metadata={
+            'name_or_flags': ['--timeout'],
+            'default': 30.0,
+            'type': float,
+            'required': False,
+            'help': 'The number of seconds to wait for a server to connect '
+                    'or send data before giving up. [default: 30]',
+        }
+    )
+    downloads: int = field(
+        metadata={
+            'name_or_flags': ['--downloads'],
+            'default': 8,
+            'type': int,
+            'required': False,
+            'help': 'The number of files to download at the same time. [default: 8]',
+        }
+    )
+    downloads_per_host: int = field(
+        metadata={
+            'name_or_flags': ['--downloads-per-host'],
+            'default': 4,
+            'type': int,
+            'required': False,
+            'help': 'The number of files to download at the same time from '
+                    'a single host, counted on the host the files are served from '
+                    'after the API redirects to it. [default: 4]',
+        }
+    )
+    metadata_only: bool = field(
+        metadata={
+            'name_or_flags': ['--metadata-only'],
+            'default': False,
+            'required': False,
+            'action': 'store_true',
+            'help': 'Only read the metadata of the new files, using HTTP range '
+                    'requests for wheels, without downloading or adding them. '
+                    'It is kept in .cache/metadata.json, and later runs only '
+                    'read the files that are not in it yet',
+        }
+    )
+    plan: bool = field(
+        metadata={
+            'name_or_flags': ['--plan'],
+            'default': False,
+            'required': False,
+            'action': 'store_true',
+            'help': 'Only list the releases and print what adding them would download, '
+                    'without downloading or adding anything',
+        }
+    )
+    cache_dir: Path = field(
+        metadata={
+            'name_or_flags': ['--cache-dir'],
+            'default': download_cache.default_directory(),
+            'required': False,
+            'help': 'The directory where downloaded files are kept between runs. '
+                    '[default: ~/.cache/warehub/downloads]',
+            'convert': (lambda string: Path(string).resolve()),
+        }
+    )
+    cache_size: int = field(
+        metadata={
+            'name_or_flags': ['--cache-size'],
+            'default': 2 * 1024 * 1024 * 1024,
+            'type': int,
+            'required': False,
+            'help': 'The number of bytes the download cache may use before the '
+                    'least recently used files are removed. 0 disables the cache. '
+                    '[default: 2 GiB]',
+        }
+    )
+    compact_size: int = field(
+        metadata={
+            'name_or_flags': ['--compact-size'],
+            'default': journal_database.COMPACT_SIZE,
+            'type': int,
+            'required': False,
+            'help': 'The number of bytes the journal of a JSON database may grow to '
+                    'before it is folded back into the database file. [default: 4 MiB]',
+        }
+    )
+
+
+@dataclass(frozen=True)
+class Asset:
+    repository: str
+    id: int
+    name: str
+    url: str
+    size: int
+    updated_at: datetime
+
+    def is_current(self, file: Optional[File]) -> bool:
+        return file is not None and file.size == self.size and self.updated_at <= file.upload_time
+
+    @property
+    def key(self) -> str:
+        return f'{self.repository}/{self.id}@{self.updated_at.isoformat()}'
+
+
+@dataclass(frozen=True)
+class Listing:
+    assets: list[Asset]
+    # Validators of the pages that were fetched, for the ETag cache
+    pages: dict[str, dict[str, Optional[str]]]
+    calls: int
+    not_modified: int
+
+
+@dataclass(frozen=True)
+class Plan:
+    """What adding a repository would do, worked out from its listing alone."""
+
+    repository: str
+    listing: Listing
+    new: list[Asset]
+    changed: list[tuple[Asset, File]]
+    unchanged: list[Asset]
+    # Files that would be taken from the download cache instead
+    cached: list[Asset]
+
+    @classmethod
+    def create(
+        cls, repository: str, listing: Listing, known: dict[str, File], downloads: download_cache.DownloadCache
+    ) -> 'Plan':
+        pending = pending_assets(listing.assets, known)
+        new: list[Asset] = []
+        changed: list[tuple[Asset, File]] = []
+        for asset in pending:
+            # Signatures go with the file they sign
+            if (file := known.get(asset.name.removesuffix('.asc'))) is None:
+                new.append(asset)
+            else:
+                changed.append((asset, file))
+        pending_set = set(pending)
+        unchanged = [a for a in listing.assets if a not in pending_set]
+        cached = [a for a in pending if a.key in downloads]
+        return cls(repository, listing, new, changed, unchanged, cached)
+
+    @property
+    def downloads(self) -> list[Asset]:
+        cached = {a.key for a in self.cached}
+        return [a for a in [*self.new, *(a for a, _ in self.changed)] if a.key not in cached]
+
+    @property
+    def download_size(self) -> int:
+        return sum(a.size for a in self.downloads)
+
+    def log(self) -> None:
+        lines = [f'Plan for {self.repository}:']
+        for asset in self.new:
+            lines.append(f'    New:       {asset.name} ({file_size_str(asset.size)})')
+        for asset, file in self.changed:
+            size = file_size_str(asset.size)
+            if asset.name == file.name:
+                size = f'{file_size_str(file.size)} -> {size}'
+            lines.append(f'    Changed:   {asset.name} ({size})')
+        lines.append(f'    Unchanged: {len(self.unchanged)} files')
+        if self.listing.not_modified > 0:
+            lines.append(f'    Not modified since the last run: {self.listing.not_modified} pages of releases')
+        logger.info('\n'.join(lines))
+        for asset in self.unchanged:
+            logger.debug(f'    Unchanged: {asset.name}')
+
+
+class Session(requests.Session):
+    """Session shared by every request of a run.
+
+    Connections are kept alive in one pool per host, so the API host and the
+    asset host each only pay for the handshake once. Credentials are only
+    sent to the API host, as requests does when following a redirect.
+    """
+
+    def __init__(self, pool_size: int, timeout: float, api_host: str):
+        super().__init__()
+        self.timeout: float = timeout
+        self.api_host: str = api_host
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        if urllib.parse.urlsplit(url).netloc != self.api_host:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'Authorization': None}
+            kwargs['auth'] = no_auth
+        return super().request(method, url, **kwargs)
+
+
+def no_auth(request: requests.PreparedRequest) -> requests.PreparedRequest:
+    return request
+
+
+class Downloader:
+    """Downloads assets concurrently, bounded overall and per host.
+
+    Blocking requests run in threads through the shared session, so the
+    event loop only schedules them. The threads are the downloader's own,
+    one for every download allowed at the same time, as the default executor
+    is shared with hashing and the cache and only has a few threads. Files
+    found in the cache are not downloaded again.
+
+    The API answers a download with a redirect to the host that serves the
+    file. The redirect is followed by hand, so that each request counts
+    against the host it goes to.
+    """
+
+    def __init__(self, session: Session, cache: download_cache.DownloadCache, limit: int, limit_per_host: int):
+        self.session: Session = session
+        self.cache: download_cache.DownloadCache = cache
+        self.limit: asyncio.Semaphore = asyncio.Semaphore(max(limit, 1))
+        self.limit_per_host: int = max(limit_per_host, 1)
+        self.hosts: dict[str, asyncio.Semaphore] = {}
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max(limit, 1), thread_name_prefix='download')
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urllib.parse.urlparse(url).netloc
+        return self.hosts.setdefault(host, asyncio.Semaphore(self.limit_per_host))
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def locate(self, asset: Asset) -> Optional[str]:
+        async with self.host_limit(asset.url):
+            return await self.run(asset_location, asset, self.session)
+
+    async def download(self, asset: Asset, directory: Path) -> Optional[Path]:
+        if await asyncio.to_thread(self.cache.get, asset.key, file := directory / asset.name):
+            logger.info(f'Using cached file for: {asset.url}')
+            return file
+        async with self.limit:
+            if (url := await self.locate(asset)) is None:
+                return None
+            async with self.host_limit(url):
+                return await self.run(download_asset, asset, url, directory, self.session)
+
+    async def describe(self, asset: Asset, directory: Path) -> Optional[dict[str, Any]]:
+        async with self.limit:
+            if (url := await self.locate(asset)) is None:
+                return None
+            async with self.host_limit(url):
+                return await self.run(describe_asset, asset, url, directory, self.session)
+
+
+class ETagCache:
+    """Validators of the release listings seen by previous runs.
+
+    The cache lives under the site path so that it is committed together with
+    the generated files and is available to the next workflow run.
+    """
+
+    def __init__(self, file: Path):
+        self.file: Path = file
+        try:
+            self.entries: dict[str, dict[str, Optional[str]]] = json.loads(file.read_text())
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self.entries = {}
+
+    def headers(self, url: str) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        entry = self.entries.get(url, {})
+        if (etag := entry.get('etag')) is not None:
+            headers['If-None-Match'] = etag
+        if (last_modified := entry.get('last_modified')) is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def next(self, url: str) -> Optional[str]:
+        return self.entries.get(url, {}).get('next')
+
+    def update(self, entries: dict[str, dict[str, Optional[str]]]) -> None:
+        self.entries.update(entries)
+
+    def save(self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.file.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+
+
+class MetadataReport:
+    """The metadata read by ``--metadata-only`` runs, with the size and URL of every file.
+
+    Like the ETag cache, it lives under the site path so the next run only
+    reads the files that are new, changed, or whose metadata could not be
+    read before.
+    """
+
+    def __init__(self, file: Path):
+        self.file: Path = file
+        try:
+            self.entries: dict[str, dict[str, Any]] = json.loads(file.read_text())
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self.entries = {}
+
+    def is_described(self, asset: Asset) -> bool:
+        entry = self.entries.get(asset.name, {})
+        return entry.get('key') == asset.key and entry.get('metadata') is not None
+
+    def update(self, asset: Asset, metadata: Optional[dict[str, Any]]) -> None:
+        self.entries[asset.name] = {
+            'key': asset.key,
+            'repository': asset.repository,
+            'url': asset.url,
+            'size': asset.size,
+            'metadata': metadata,
+        }
+
+    def save(self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.file.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+
+
+def add(args: list[str]):
+    """Execute the ``add`` command for every repository in one run.
+
+    Releases are listed and their files downloaded and read concurrently,
+    while the packages are registered in the database one at a time, as
+    warehub's database is not thread-safe. The site is generated once at the
+    end.
+    :param args:
+        The command-line arguments.
+    """
+
+    add_args: AddPackagesArgs = AddPackagesArgs.from_args(args)
+
+    warehub.command.setup(add_args)
+    if not sqlite_database.configure():
+        journal_database.configure(add_args.compact_size)
+    warehub.package.validate_pep440_specifier = validate_pep440_specifier
+
+    return add_impl(add_args)
+
+
+def add_impl(args: AddPackagesArgs):
+    cache = ETagCache(Config.path / '.cache' / 'releases.json')
+
+    downloads = download_cache.DownloadCache(args.cache_dir, args.cache_size)
+
+    if args.plan:
+        # Nothing is saved, so that the next run still fetches and adds
+        # everything that was planned
+        with create_session(args) as session:
+            log_plans(asyncio.run(plan_repositories(args, session, cache, downloads)))
+        return
+
+    report = MetadataReport(Config.path / '.cache' / 'metadata.json')
+
+    with create_session(args) as session, tempfile.TemporaryDirectory() as temp:
+        skipped, added = asyncio.run(add_repositories(args, session, cache, downloads, report, Path(temp)))
+
+    cache.save()
+    downloads.save()
+    if args.metadata_only:
+        report.save()
+
+    logger.info(f'Skipped {skipped} unchanged files')
+
+    if len(added) == 0:
+        logger.info('No Packages Added')
+        return
+
+    if not args.no_generate:
+        generate_site.generate_impl(generate_site.GenerateSiteArgs(args.verbose, args.config, False, None, 1, None))
+
+    logger.info(f'View new Packages at:')
+    for url in sorted(added):
+        logger.info(f'\t{url}')
+
+
+async def add_repositories(
+    args: AddPackagesArgs,
+    session: Session,
+    cache: ETagCache,
+    downloads: download_cache.DownloadCache,
+    report: MetadataReport,
+    temp: Path,
+) -> tuple[int, set[str]]:
+    repositories = asyncio.Semaphore(max(args.jobs, 1))
+    downloader = Downloader(session, downloads, args.downloads, args.downloads_per_host)
+
+    async def add_repository(repository: str) -> tuple[int, set[str]]:
+        try:
+            async with repositories:
+                listing = await asyncio.to_thread(list_assets, args, repository, session, cache)
+        except requests.RequestException as e:
+            logger.exception(f'Could not fetch repository: {repository}', exc_info=e)
+            return 0, set()
+        assets, pages = listing.assets, listing.pages
+
+        # Threads only read this copy, the database itself is only touched
+        # from the event loop
+        known = known_files({a.name for a in assets})
+        pending = pending_assets(assets, known)
+        logger.info(f'Skipping {len(assets) - len(pending)} unchanged files in {repository}')
+
+        directory = Path(tempfile.mkdtemp(dir=temp))
+
+        if args.metadata_only:
+            described = {a for a in pending if not a.name.endswith('.asc') and report.is_described(a)}
+            logger.info(f'Skipping {len(described)} files already in the metadata report of {repository}')
+
+            async def describe(asset: Asset) -> None:
+                report.update(asset, await downloader.describe(asset, directory))
+
+            await asyncio.gather(
+                *(describe(a) for a in pending if not a.name.endswith('.asc') and a not in described)
+            )
+            return len(assets) - len(pending), set()
+
+        async def fetch(asset: Asset) -> tuple[Optional[Path], Optional[Package]]:
+            if (file := await downloader.download(asset, directory)) is None:
+                return None, None
+            package: Optional[Package] = None
+            if file.suffix != '.asc':
+                # Hash and read the metadata as soon as the download completes
+                package = await asyncio.to_thread(load_package, file)
+            digest = package.sha256_digest if package is not None else None
+            await asyncio.to_thread(downloads.put, asset.key, file, digest)
+            return file, package
+
+        fetched = await asyncio.gather(*(fetch(asset) for asset in pending))
+
+        signatures = {f.name: f for f, _ in fetched if f is not None and f.suffix == '.asc'}
+        added, registered = register_packages([p for _, p in fetched if p is not None], signatures, known)
+
+        packages = sum(1 for a in pending if not a.name.endswith('.asc'))
+        if any(file is None for file, _ in fetched) or registered < packages:
+            # Listings are only cached once all of their files were added, so
+            # that the missing ones are retried next time
+            pages = {}
+        cache.update(pages)
+        return len(assets) - len(pending), added
+
+    try:
+        results = await asyncio.gather(*(add_repository(r) for r in args.repositories))
+    finally:
+        downloader.close()
+    return sum(skipped for skipped, _ in results), set().union(*(added for _, added in results))
+
+
+async def plan_repositories(
+    args: AddPackagesArgs,
+    session: Session,
+    cache: ETagCache,
+    downloads: download_cache.DownloadCache,
+) -> list[Plan]:
+    repositories = asyncio.Semaphore(max(args.jobs, 1))
+
+    async def plan_repository(repository: str) -> Optional[Plan]:
+        try:
+            async with repositories:
+                listing = await asyncio.to_thread(list_assets, args, repository, session, cache)
+        except requests.RequestException as e:
+            logger.exception(f'Could not fetch repository: {repository}', exc_info=e)
+            return None
+        plan = Plan.create(repository, listing, known_files({a.name for a in listing.assets}), downloads)
+        plan.log()
+        return plan
+
+    plans = await asyncio.gather(*(plan_repository(r) for r in args.repositories))
+    return [p for p in plans if p is not None]
+
+
+def log_plans(plans: list[Plan]) -> None:
+    new = sum(len(p.new) for p in plans)
+    changed = sum(len(p.changed) for p in plans)
+    unchanged = sum(len(p.unchanged) for p in plans)
+    downloads = sum(len(p.downloads) for p in plans)
+    cached = sum(len(p.cached) for p in plans)
+    listing_calls = sum(p.listing.calls for p in plans)
+    not_modified = sum(p.listing.not_modified for p in plans)
+
+    logger.info(
+        '\n'.join(
+            [
+                f'Plan: {new} new, {changed} changed and {unchanged} unchanged files',
+                f'    Download: {file_size_str(sum(p.download_size for p in plans))} in {downloads} files'
+                f' ({cached} more from the download cache)',
+                # Every download starts with a request to the API, that
+                # redirects to the asset host
+                f'    API calls: about {listing_calls + downloads}, {listing_calls} to list the releases'
+                f' ({not_modified} of them not modified) and {downloads} to download files',
+            ]
+        )
+    )
+
+
+def create_session(args: AddPackagesArgs) -> Session:
+    # Every download from the same host needs its own connection
+    pool_size = max(args.pool_size, args.downloads_per_host)
+    session = Session(pool_size, args.timeout, urllib.parse.urlsplit(parse_url(args.domain)).netloc)
+    if args.token is not None:
+        session.headers['Authorization'] = f'token {args.token}'
+        logger.debug('Token Provided')
+    elif args.username is not None or args.password is not None:
+        session.auth = (args.username or '', args.password or '')
+        logger.debug('Username and Password provided')
+    return session
+
+
+def list_assets(args: AddArgs, repository: str, session: Session, cache: ETagCache) -> Listing:
+    assets: list[Asset] = []
+    pages: dict[str, dict[str, Optional[str]]] = {}
+    calls = not_modified = 0
+    url: Optional[str] = parse_url(args.domain + f'repos/{repository}/releases?per_page=100')
+    while url is not None:
+        logger.info(f'Getting Releases from: {url}')
+        response = session.get(url, headers=cache.headers(url))
+        calls += 1
+        logger.debug(f'Response Code: {response.status_code}')
+        if response.status_code == requests.codes.not_modified:
+            # Does not count against the rate limit and nothing on this page
+            # changed since it was last processed
+            logger.info(f'Releases not modified: {url}')
+            not_modified += 1
+            url = cache.next(url)
+            continue
+        if response.status_code != requests.codes.ok:
+            logger.warning(
+                f'Could not get information on release for '
+                f"'{url}': {response.json().get('message')}"
+            )
+            break
+        for release in response.json():
+            for asset in release['assets']:
+                if not asset['name'].endswith((*DIST_EXTENSIONS, '.asc')):
+                    continue
+                updated_at = datetime.fromisoformat(asset['updated_at'].replace('Z', '+00:00'))
+                assets.append(
+                    Asset(
+                        repository,
+                        asset['id'],
+                        asset['name'],
+                        asset['url'],
+                        asset['size'],
+                        # The database stores naive local times
+                        updated_at.astimezone().replace(tzinfo=None),
+                    )
+                )
+        next_url = response.links.get('next', {}).get('url')
+        pages[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'next': next_url,
+        }
+        url = next_url
+    logger.info(f'Found {len(assets)} files in {repository}')
+    return Listing(assets, pages, calls, not_modified)
+
+
+def known_files(names: set[str]) -> dict[str, File]:
+    if (files := sqlite_database.select_in(File, 'name', sorted(names))) is None:
+        files = Database.get(File)
+    return {f.name: f for f in files if f.name in names}
+
+
+def pending_assets(assets: list[Asset], known: dict[str, File]) -> list[Asset]:
+    pending = [a for a in assets if a.name.endswith('.asc') or not a.is_current(known.get(a.name))]
+    # Signatures are only needed alongside the file they sign
+    names = {a.name for a in pending}
+    return [a for a in pending if not a.name.endswith('.asc') or a.name.removesuffix('.asc') in names]
+
+
+def asset_location(asset: Asset, session: Session) -> Optional[str]:
+    """The URL the API redirects the download of an asset to.
+
+    A server that sends the file itself is asked for it again by the
+    download, as the body is not read here.
+    """
+
+    try:
+        with session.get(asset.url, headers=DOWNLOAD_HEADERS, allow_redirects=False, stream=True) as response:
+            logger.debug(f'Response Code: {response.status_code}')
+            if response.is_redirect:
+                # Read, so that the connection goes back to the pool
+                response.content
+                return urllib.parse.urljoin(asset.url, response.headers['Location'])
+            if response.status_code == requests.codes.ok:
+                return asset.url
+            logger.warning(f"Could not download '{asset.url}': {response.status_code}")
+    except requests.RequestException as e:
+        logger.exception(f"Could not download '{asset.url}'", exc_info=e)
+    return None
+
+
+def download_asset(asset: Asset, url: str, directory: Path, session: Session) -> Optional[Path]:
+    file = directory / asset.name
+    try:
+        with session.get(url, headers=DOWNLOAD_HEADERS, stream=True) as download:
+            logger.debug(f'Response Code: {download.status_code}')
+            if download.status_code != requests.codes.ok:
+                logger.warning(f"Could not download '{asset.url}': {download.status_code}")
+                return None
+            # Written as it arrives so that no file is ever held in memory.
+            # Package then hashes it from disk in a single chunked read.
+            with file.open('wb') as fp:
+                for chunk in download.iter_content(chunk_size=CHUNK_SIZE):
+                    fp.write(chunk)
+    except requests.RequestException as e:
+        logger.exception(f"Could not download '{asset.url}'", exc_info=e)
+        file.unlink(missing_ok=True)
+        return None
+
+    logger.info(f'Downloaded File: {asset.url}\n  to: {file.absolute()}')
+
+    return file
+
+
+def describe_asset(asset: Asset, url: str, directory: Path, session: Session) -> Optional[dict[str, Any]]:
+    """Log the metadata of an asset.
+
+    :return:
+        The fields that were logged, or ``None`` if the metadata could not be
+        read.
+    """
+
+    metadata: Optional[bytes] = None
+    if asset.name.endswith('.whl'):
+        try:
+            if (metadata := wheel_metadata.fetch_metadata(session, url, asset.size)) is None:
+                logger.debug(f'Range requests not supported, downloading: {asset.url}')
+                if (file := download_asset(asset, url, directory, session)) is not None:
+                    metadata = wheel_metadata.read_metadata(file)
+                    file.unlink()
+        except (requests.RequestException, OSError, zipfile.BadZipFile) as e:
+            logger.exception(f"Could not read the metadata of '{asset.url}'", exc_info=e)
+
+    lines = [f'Metadata of {asset.name} ({file_size_str(asset.size)}): {asset.url}']
+    if metadata is None:
+        lines.append('    Not available without downloading the file')
+        logger.info('\n'.join(lines))
+        return None
+
+    message = email.message_from_bytes(metadata)
+    fields: dict[str, Any] = {}
+    for header in ('Name', 'Version', 'Summary', 'Requires-Python'):
+        if (value := message.get(header)) is not None:
+            lines.append(f'    {header}: {value}')
+            fields[header] = value
+    fields['Requires-Dist'] = message.get_all('Requires-Dist', [])
+    for requirement in fields['Requires-Dist']:
+        lines.append(f'    Requires-Dist: {requirement}')
+    logger.info('\n'.join(lines))
+    return fields
+
+
+def validate_pep440_specifier(value: Optional[str]) -> Optional[str]:
+    """warehub's check of Requires-Python, returning the value like its other checks.
+
+    warehub's own returns nothing, so releases never had a Requires-Python,
+    and fails on packages that do not declare one.
+    """
+
+    if value is None:
+        return None
+    try:
+        SpecifierSet(value)
+    except InvalidSpecifier:
+        raise ValueError('Invalid specifier in requirement.') from None
+    return value
+
+
+def load_package(file: Path) -> Optional[Package]:
+    try:
+        package = Package(file, None)
+    except Exception as e:
+        logger.exception(f'Exception found when processing file: {file.name}', exc_info=e)
+        return None
+
+    logger.debug(
+        f"Package created for file: '{package.file.name}' "
+        f'({file_size_str(package.file)})'
+    )
+    return package
+
+
+def register_packages(
+    packages: list[Package], signatures: dict[str, Path], known: dict[str, File]
+) -> tuple[set[str], int]:
+    """Add or replace the packages in the database.
+
+    :return:
+        The pages of the releases that were added to, and the number of
+        packages that were registered.
+    """
+
+    added: set[str] = set()
+    registered = 0
+    for package in packages:
+        try:
+            if (signed_name := package.signed_file.name) in signatures:
+                package.gpg_signature = signatures[signed_name]
+
+            if (file_entry := known.get(package.file.name)) is not None:
+                update_package(package, file_entry)
+            else:
+                add_package(package)
+
+            if package.file.suffix == '.whl':
+                sidecar = wheel_metadata.sidecar(Config.path / Directory.FILES / package.file.name)
+                sidecar.write_bytes(wheel_metadata.read_metadata(package.file))
+
+            added.add(f'{Config.url}{Directory.PROJECT}/{package.name}/{package.version}/')
+            registered += 1
+        except Exception as e:
+            logger.exception(f'Exception found when processing file: {package.file.name}', exc_info=e)
+    return added, registered
+
+
+def update_package(package: Package, file: File) -> None:
+    """Replace a file that changed since it was added, with the checks and records of ``add_package``."""
+
+    logger.info(f'Replacing changed file: {package.file.name}')
+
+    projects = Database.get(Project, where=Project.name == package.name)
+    if len(projects) != 1:
+        raise ValueError(f"Expected one Project with name '{package.name}', found {len(projects)}")
+    project = projects[0]
+
+    file_size = package.file.stat().st_size
+    if file_size > MAX_FILE_SIZE:
+        raise ValueError(f'File too large. Limit is {file_size_str(MAX_FILE_SIZE)}')
+    if package.gpg_signature is not None:
+        signature_size = package.gpg_signature.stat().st_size
+        if signature_size > MAX_SIG_SIZE:
+            raise ValueError(f'Signature file too large. Limit is {file_size_str(MAX_SIG_SIZE)}')
+        file_size += signature_size
+
+    # The project counts the replaced file and its signature, as they were added
+    previous_size = file.size
+    if file.has_signature and (previous_signature := Config.path / Directory.FILES / file.pgp_name).exists():
+        previous_size += previous_signature.stat().st_size
+    total_size = project.total_size + file_size - previous_size
+    if total_size > MAX_PROJECT_SIZE:
+        raise ValueError(f'Project is now too large. Limit is {file_size_str(MAX_PROJECT_SIZE)}')
+    project.total_size = total_size
+    Database.put(Project, project)
+
+    signed_name = package.signed_file.name
+    if package.gpg_signature is not None and len(Database.get(FileName, where=FileName.name == signed_name)) == 0:
+        # A signature added after the file, its name is taken like add_package does
+        Database.put(FileName, FileName(signed_name))
+
+    file.size = package.file.stat().st_size
+    file.md5_digest = package.md5_digest
+    file.sha256_digest = package.sha256_digest
+    file.blake2_256_digest = package.blake2_256_digest
+    file.has_signature = package.gpg_signature is not None
+    file.upload_time = datetime.now()
+    # Put back, as the journal only writes the entries handed out since the
+    # last commit, and this one may have been read before it
+    Database.put(File, file)
+
+    shutil.copy(package.file, Config.path / Directory.FILES / package.file.name)
+    if package.gpg_signature is not None:
+        shutil.copy(package.gpg_signature, Config.path / Directory.FILES / package.signed_file.name)
+    Database.commit()
+
+
+if __name__ == '__main__':
+    add(sys.argv[1:])
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def default_directory() -> Path:
+    return Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'warehub' / 'downloads'
+
+
+def file_sha256(file: Path) -> str:
+    sha256 = hashlib.sha256()
+    with file.open('rb') as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class DownloadCache:
+    """Downloaded release assets, kept across runs.
+
+    Files are stored once under their sha256 digest and looked up by the key
+    of the asset they were downloaded from. Once the cache grows past its
+    maximum size the least recently used files are evicted. A maximum size
+    of zero disables the cache.
+    """
+
+    def __init__(self, directory: Path, max_size: int):
+        self.directory: Path = directory
+        self.objects: Path = directory / 'objects'
+        self.index_file: Path = directory / 'index.json'
+        self.max_size: int = max_size
+        self.lock: threading.Lock = threading.Lock()
+
+        try:
+            self.index: dict[str, str] = json.loads(self.index_file.read_text())
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self.index = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __contains__(self, key: str) -> bool:
+        return self.enabled and key in self.index
+
+    def get(self, key: str, destination: Path) -> bool:
+        """Place the cached file for ``key`` at ``destination`` if there is one."""
+
+        if not self.enabled or (digest := self.index.get(key)) is None:
+            return False
+        source = self.objects / digest
+        try:
+            # Used files are touched so that eviction removes the stale ones
+            os.utime(source)
+            try:
+                os.link(source, destination)
+            except OSError:
+                shutil.copyfile(source, destination)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key: str, file: Path, digest: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        digest = digest or file_sha256(file)
+        self.objects.mkdir(parents=True, exist_ok=True)
+        if not (target := self.objects / digest).exists():
+            temp = target.with_name(f'{digest}.{threading.get_ident()}.tmp')
+            shutil.copyfile(file, temp)
+            os.replace(temp, target)
+        with self.lock:
+            self.index[key] = digest
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        self.prune()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_file.write_text(json.dumps(self.index, indent=2, sort_keys=True))
+
+    def prune(self) -> None:
+        if not self.objects.exists():
+            return
+        objects = sorted(self.objects.iterdir(), key=lambda f: f.stat().st_mtime, reverse=True)
+        total = 0
+        for file in objects:
+            total += file.stat().st_size
+            if total > self.max_size:
+                file.unlink()
+        existing = {f.name for f in self.objects.iterdir()}
+        self.index = {k: d for k, d in self.index.items() if d in existing}
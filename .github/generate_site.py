@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import math
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import PurePosixPath
+from typing import Any, Optional
+
+import warehub
+import warehub.command
+from warehub.arguments import GenerateArgs
+from warehub.config import Config
+from warehub.database import Database
+from warehub.model import Directory, File, Project, Release, Template
+
+import homepage
+import journal_database
+import precompress
+import project_pages
+import search_index
+import simple_api
+import sqlite_database
+import static_assets
+from precompress import Precompressor
+from site_writer import SiteWriter
+
+logger = logging.getLogger(warehub.__title__)
+
+# Directories holding the pages of a single project, named after the project
+PROJECT_DIRECTORIES = (Directory.PROJECT, Directory.SIMPLE, Directory.PYPI)
+
+# Changed whenever the pages change for the same database, so that every
+# project is generated again
+PAGES_VERSION = 5
+
+# Shards of projects for every job, so that a worker that is done early can
+# take over part of the work of the others
+SHARDS_PER_JOB = 4
+
+# Templates patched while rendering, that workers get from the parent
+TEMPLATES = ('HOMEPAGE', 'RELEASE', 'SIMPLE', 'STYLE')
+
+
+@dataclass(frozen=True)
+class GenerateSiteArgs(GenerateArgs):
+    full: bool = field(
+        metadata={
+            'name_or_flags': ['--full'],
+            'default': False,
+            'required': False,
+            'action': 'store_true',
+            'help': 'Regenerate the pages of every project, not only the changed ones',
+        }
+    )
+    precompress: Optional[int] = field(
+        metadata={
+            'name_or_flags': ['--precompress'],
+            'default': None,
+            'nargs': '?',
+            'const': precompress.MIN_SIZE,
+            'type': int,
+            'required': False,
+            'metavar': 'MIN_SIZE',
+            'help': 'Also write .gz and .br files of the pages of at least MIN_SIZE bytes '
+                    f'[default: {precompress.MIN_SIZE}]. Later runs keep doing so until '
+                    'it is turned off with 0.',
+        }
+    )
+    jobs: int = field(
+        metadata={
+            'name_or_flags': ['-j', '--jobs'],
+            'default': 1,
+            'type': int,
+            'required': False,
+            'metavar': 'N',
+            'help': 'Render the pages of the projects in N processes [default: 1]',
+        }
+    )
+    fonts: Optional[str] = field(
+        metadata={
+            'name_or_flags': ['--fonts'],
+            'default': None,
+            'choices': static_assets.FONT_SOURCES,
+            'required': False,
+            'help': 'Where the pages load the font from when it is not bundled in .github/assets/fonts: '
+                    'google links Google Fonts, system only uses the fonts of the system, so the pages '
+                    'need no other site [default: google]. Later runs keep the choice.',
+        }
+    )
+
+
+@dataclass
+class Index:
+    """Every table of the database, grouped by project."""
+
+    projects: list[Project]
+    releases: dict[int, list[Release]]
+    files: dict[int, list[File]]
+
+    @classmethod
+    def load(cls) -> 'Index':
+        # Every row goes into the digests that find the changed projects, so
+        # each table is read whole, in one query with SQLite
+        releases: defaultdict[int, list[Release]] = defaultdict(list)
+        for release in Database.get(Release):
+            releases[release.project_id].append(release)
+        files: defaultdict[int, list[File]] = defaultdict(list)
+        for file in Database.get(File):
+            files[file.release_id].append(file)
+        return cls(list(Database.get(Project)), releases, files)
+
+    def digest(self, project: Project) -> str:
+        releases = self.releases[project.id]
+        files = [f for r in releases for f in self.files[r.id]]
+        rows = [asdict(project), [asdict(r) for r in releases], [asdict(f) for f in files]]
+        return hashlib.sha256(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def generate(args: list[str]):
+    """Execute the ``generate`` command, only rendering changed projects.
+
+    A digest of every project is kept next to the database. Only the pages of
+    projects whose digest changed are rendered again, together with the root
+    listings. Files whose content did not change are not written again.
+    :param args:
+        The command-line arguments.
+    """
+
+    generate_args: GenerateSiteArgs = GenerateSiteArgs.from_args(args)
+
+    warehub.command.setup(generate_args)
+    if not sqlite_database.configure():
+        journal_database.configure()
+
+    return generate_impl(generate_args)
+
+
+def generate_impl(args: GenerateSiteArgs):
+    index = Index.load()
+
+    digests_file = (Config.path / Config.database).with_suffix('.digests.json')
+    try:
+        previous = json.loads(digests_file.read_text())
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        previous = {}
+
+    if (min_size := args.precompress) is None:
+        min_size = previous.get('precompress', 0)
+    precompressor = Precompressor(min_size) if min_size > 0 else None
+
+    if (fonts := args.fonts) is None:
+        fonts = previous.get('fonts', static_assets.GOOGLE_FONTS)
+    assets = static_assets.build(fonts)
+
+    site = site_digest(precompressor, assets)
+    digests = {p.name: index.digest(p) for p in index.projects}
+    if args.full or previous.get('site') != site:
+        dirty = list(index.projects)
+    else:
+        dirty = [p for p in index.projects if previous.get('projects', {}).get(p.name) != digests[p.name]]
+    removed = set(previous.get('projects', {})) - set(digests)
+
+    writer = SiteWriter(Config.path, precompressor)
+    if precompressor is None and previous.get('precompress', 0) > 0:
+        remove_compressed(writer)
+
+    logger.info('Writing Static Assets')
+    static_assets.write(writer, assets)
+
+    with static_assets.serving(assets):
+        logger.info(f'Generating pages of {len(dirty)} of {len(index.projects)} projects')
+        render_projects(index, dirty, writer, args.jobs)
+
+        for name in removed:
+            logger.info(f'Deleting pages of removed project: {name}')
+            for directory in PROJECT_DIRECTORIES:
+                writer.delete(Config.path / directory / name)
+
+        logger.info('Generating Homepage')
+        search_url = f'{Config.url}{search_index.DIRECTORY}/{search_index.MANIFEST_FILE}'
+        pages = homepage.render_pages(index, assets.script_url, search_url)
+        for path, page in pages.items():
+            writer.write(Config.path / path, page)
+        if (pages_directory := Config.path / homepage.PAGES_DIRECTORY).exists():
+            for directory in pages_directory.iterdir():
+                if directory.relative_to(Config.path) / 'index.html' not in pages:
+                    writer.delete(directory)
+
+        logger.info('Generating Simple Project List')
+        writer.write(Config.path / Directory.SIMPLE / 'index.html', render_simple_index(index))
+        writer.write(Config.path / Directory.SIMPLE / simple_api.JSON_FILE, simple_api.index_document(index))
+
+    logger.info('Generating Search Index')
+    # Shards are rendered again whenever the pages are, so that the ones that
+    # did not change still get compressed when --precompress is turned on
+    previous_search = previous.get('search', {}) if previous.get('site') == site else {}
+    search = search_index.write(writer, index, digests, previous_search)
+
+    digests_state = {'site': site, 'projects': digests, 'precompress': min_size, 'fonts': fonts, 'search': search}
+    writer.write(digests_file, json.dumps(digests_state, indent=2, sort_keys=True))
+
+    logger.info(f'Wrote {len(writer.written)} changed files, deleted {len(writer.deleted)}')
+    writer.save_manifest(Config.path / '.cache' / 'manifest.json')
+
+
+def site_digest(precompressor: Optional[Precompressor], assets: static_assets.Assets) -> str:
+    """Digest of everything besides the database that ends up in every page."""
+
+    inputs = [
+        warehub.__version__,
+        Config.url,
+        Config.title,
+        Config.description,
+        Config.image_url,
+        Template.HOMEPAGE,
+        Template.RELEASE,
+        Template.SIMPLE,
+        Template.STYLE,
+        PAGES_VERSION,
+        repr(precompressor),
+        assets.digest,
+        assets.google_fonts,
+    ]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+def remove_compressed(writer: SiteWriter) -> None:
+    logger.info('Deleting compressed pages')
+    for file in list(Config.path.rglob('*')):
+        if precompress.applies(file.relative_to(Config.path)):
+            for sibling in precompress.siblings(file):
+                writer.delete(sibling)
+
+
+def render_project(index: Index, project: Project, writer: SiteWriter) -> None:
+    pages = {**project_pages.render_project(index, project), **simple_api.render_project(index, project, writer)}
+    for directory in PROJECT_DIRECTORIES:
+        root = PurePosixPath(directory, project.name)
+        files = {p.relative_to(root): page for p, page in pages.items() if p.is_relative_to(root)}
+        writer.sync(Config.path / root, files)
+
+
+def render_projects(index: Index, projects: list[Project], writer: SiteWriter, jobs: int = 1) -> None:
+    """Render the pages of the given projects, in ``jobs`` processes.
+
+    With more than one job, the projects are split in contiguous shards that
+    the workers render and write themselves, as the pages of a project only
+    depend on its own rows. The pages are the same as the ones of a single
+    process, only the order they are written in differs.
+    """
+
+    if jobs <= 1 or len(projects) < 2:
+        for project in projects:
+            render_project(index, project, writer)
+        return
+
+    size = math.ceil(len(projects) / (jobs * SHARDS_PER_JOB))
+    shards = [[p.id for p in projects[i:i + size]] for i in range(0, len(projects), size)]
+
+    state = (index, writer.precompressor, config_values(), {n: getattr(Template, n) for n in TEMPLATES})
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=state) as pool:
+        for written, deleted in pool.map(render_shard, shards):
+            writer.written.update(written)
+            writer.deleted.update(deleted)
+
+
+def config_values() -> dict[str, Any]:
+    return {f.name: getattr(Config, f.name) for f in fields(Config)}
+
+
+# Set in every worker process by init_worker
+worker_index: Optional[Index] = None
+worker_precompressor: Optional[Precompressor] = None
+
+
+def init_worker(index: Index, precompressor: Optional[Precompressor], config: dict[str, Any], templates: dict[str, str]):
+    global worker_index, worker_precompressor
+    worker_index = index
+    worker_precompressor = precompressor
+    # Workers that are not forked start from the module defaults, not from
+    # the config and the templates of the pages being rendered
+    for name, value in config.items():
+        setattr(Config, name, value)
+    for name, template in templates.items():
+        setattr(Template, name, template)
+
+
+def render_shard(ids: list[int]) -> tuple[set[str], set[str]]:
+    projects = {p.id: p for p in worker_index.projects}
+    writer = SiteWriter(Config.path, worker_precompressor)
+    for id in ids:
+        render_project(worker_index, projects[id], writer)
+    return writer.written, writer.deleted
+
+
+def render_simple_index(index: Index) -> str:
+    project_list = ''
+    for project in index.projects:
+        if len(index.releases[project.id]) < 1:
+            continue
+        project_list += f'\n    <a class="card" href="{project.name}/">{project.name}</a><br/>'
+
+    return simple_api.html_page(project_list)
+
+
+if __name__ == '__main__':
+    generate(sys.argv[1:])
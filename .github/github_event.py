@@ -0,0 +1,155 @@
+import json
+import os
+import re
+from typing import Any, Optional, TextIO
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'\s*')
+STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+SCALAR = re.compile(r'[^,:{}\[\]"\s]+')
+STRUCTURE = re.compile(r'[^"{}\[\]]+')
+
+
+class EventReader:
+    """Reads one value out of a JSON document, without loading the rest of it.
+
+    The document is read in chunks, and only as far as the value. Everything
+    before it is skipped over without being decoded, and the chunks that were
+    passed are dropped.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.file: TextIO = file
+        self.chunk_size: int = chunk_size
+        self.buffer: str = ''
+        self.pos: int = 0
+        self.start: Optional[int] = None
+        self.eof: bool = False
+
+    def fill(self) -> bool:
+        """Read the next chunk, returning whether there was one."""
+
+        if self.eof:
+            return False
+        # Keep the value being read, if any
+        keep = self.pos if self.start is None else self.start
+        self.buffer = self.buffer[keep:]
+        self.pos -= keep
+        if self.start is not None:
+            self.start -= keep
+
+        chunk = self.file.read(self.chunk_size)
+        self.eof = chunk == ''
+        self.buffer += chunk
+        return not self.eof
+
+    def match(self, pattern: re.Pattern) -> Optional[re.Match]:
+        """Match ``pattern`` at the current position, reading more until the match ends before the buffer does."""
+
+        while True:
+            match = pattern.match(self.buffer, self.pos)
+            if match is not None and (match.end() < len(self.buffer) or self.eof):
+                return match
+            if not self.fill():
+                return pattern.match(self.buffer, self.pos)
+
+    def peek(self) -> str:
+        self.pos = self.match(WHITESPACE).end()
+        if self.pos >= len(self.buffer):
+            raise ValueError('Unexpected end of the document')
+        return self.buffer[self.pos]
+
+    def expect(self, character: str) -> None:
+        if (found := self.peek()) != character:
+            raise ValueError(f'Expected {character!r} at {self.pos}, found {found!r}')
+        self.pos += 1
+
+    def skip_string(self) -> None:
+        self.pos += 1
+        if (match := self.match(STRING_END)) is None:
+            raise ValueError('Unterminated string')
+        self.pos = match.end()
+
+    def string(self) -> str:
+        self.start = self.pos
+        try:
+            self.skip_string()
+            return json.loads(self.buffer[self.start:self.pos])
+        finally:
+            self.start = None
+
+    def skip(self) -> None:
+        """Skip over the next value."""
+
+        character = self.peek()
+        if character == '"':
+            self.skip_string()
+        elif character in '{[':
+            depth = 0
+            while True:
+                character = self.peek()
+                if character == '"':
+                    self.skip_string()
+                    continue
+                if character in '{[':
+                    depth += 1
+                elif character in '}]':
+                    depth -= 1
+                else:
+                    self.pos = self.match(STRUCTURE).end()
+                    continue
+                self.pos += 1
+                if depth == 0:
+                    return
+        elif (match := self.match(SCALAR)) is not None:
+            self.pos = match.end()
+        else:
+            raise ValueError(f'Unexpected {character!r} at {self.pos}')
+
+    def value(self) -> Any:
+        if self.peek() == '"':
+            return self.string()
+        self.start = self.pos
+        try:
+            self.skip()
+            return json.loads(self.buffer[self.start:self.pos])
+        finally:
+            self.start = None
+
+    def find(self, *keys: str) -> Any:
+        """The value at ``keys``, going down one object for each key.
+
+        :raise KeyError:
+            If one of the objects does not have the key.
+        """
+
+        for key in keys:
+            self.expect('{')
+            while True:
+                if self.peek() == '}':
+                    raise KeyError(key)
+                name = self.string()
+                self.expect(':')
+                if name == key:
+                    break
+                self.skip()
+                if self.peek() == ',':
+                    self.pos += 1
+        return self.value()
+
+
+def issue_body() -> str:
+    """The body of the issue that triggered the workflow.
+
+    It is read from the event file at ``GITHUB_EVENT_PATH``, which the runner
+    always writes. The whole ``GITHUB_CONTEXT`` is only loaded when there is
+    no event file, like when running locally.
+    """
+
+    if (path := os.environ.get('GITHUB_EVENT_PATH')) is not None:
+        with open(path, encoding='utf-8') as file:
+            body = EventReader(file).find('issue', 'body')
+    else:
+        body = json.loads(os.environ['GITHUB_CONTEXT'])['event']['issue']['body']
+    return body or ''
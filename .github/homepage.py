@@ -0,0 +1,168 @@
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import warehub
+from packaging.utils import canonicalize_name
+from warehub.config import Config
+from warehub.model import Directory, Project, Release, Template
+
+from templates import compile_template, style
+
+if TYPE_CHECKING:
+    from generate_site import Index
+
+# Cards on each page of the homepage, so that it stays the same size however
+# many projects there are
+PAGE_SIZE = 100
+
+# Pages after the first one are written to page/<number>/index.html
+PAGES_DIRECTORY = 'page'
+
+STYLE = '''
+.pagination {
+    margin: 1rem 0.5rem;
+    font-size: 1.4rem;
+}
+
+.pagination a, .pagination span {
+    margin-right: 1rem;
+}
+
+.pagination .disabled {
+    color: #bbb;
+}
+
+.searching .listing, .searching .pagination {
+    display: none;
+}
+'''
+
+LETTERS = '#ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def latest_release(releases: list[Release]) -> Release:
+    # Same choice as warehub, which compares the versions as strings
+    latest = releases[0]
+    for release in releases:
+        if not release.yanked and release.version > latest.version:
+            latest = release
+    return latest
+
+
+def letter(project: Project) -> str:
+    first = project.name[:1].upper()
+    return first if first in LETTERS else '#'
+
+
+def page_file(number: int) -> Path:
+    if number == 1:
+        return Path('index.html')
+    return Path(PAGES_DIRECTORY) / str(number) / 'index.html'
+
+
+def page_url(number: int) -> str:
+    if number == 1:
+        return Config.url
+    return f'{Config.url}{PAGES_DIRECTORY}/{number}/'
+
+
+def link(number: Optional[int], text: str) -> str:
+    if number is None:
+        return f'<span class="disabled">{text}</span>'
+    return f'<a href="{page_url(number)}">{text}</a>'
+
+
+def navigation(number: int, count: int) -> str:
+    indent = ' ' * 4
+    links = [
+        link(1 if number > 1 else None, '&laquo; First'),
+        link(number - 1 if number > 1 else None, '&lsaquo; Previous'),
+        f'<span>Page {number} of {count}</span>',
+        link(number + 1 if number < count else None, 'Next &rsaquo;'),
+        link(count if number < count else None, 'Last &raquo;'),
+    ]
+    return f'\n{indent}<nav class="pagination">{" ".join(links)}</nav>'
+
+
+def letters_navigation(first_pages: dict[str, int]) -> str:
+    indent = ' ' * 4
+    links = []
+    for character in LETTERS:
+        if (number := first_pages.get(character)) is None:
+            links.append(f'<span class="disabled">{character}</span>')
+        else:
+            links.append(f'<a href="{page_url(number)}#letter-{character}">{character}</a>')
+    return f'\n{indent}<nav class="pagination">{" ".join(links)}</nav>'
+
+
+def search_box(script_url: str, index_url: str) -> str:
+    indent = ' ' * 4
+    return (
+        f'\n{indent}<input class="u-full-width" type="search" id="search" placeholder="Search packages"'
+        f' aria-label="Search packages" autocomplete="off"/>'
+        f'\n{indent}<div id="search-results"></div>'
+        f'\n{indent}<script defer src="{script_url}" data-index="{index_url}"></script>'
+    )
+
+
+def card(project: Project, latest: Release, anchor: Optional[str]) -> str:
+    indent = ' ' * 4
+    id = '' if anchor is None else f' id="letter-{anchor}"'
+    return (
+        f'\n{indent}<a class="card"{id} href="{Config.url}{Directory.PROJECT}/{project.name}/">'
+        f'\n{indent}    {project.name}<span class="version">{latest.version}</span>'
+        f'\n{indent}    <span class="description">{latest.summary}</span>'
+        f'\n{indent}</a>'
+    )
+
+
+def render_pages(index: 'Index', script_url: str, search_url: str) -> dict[Path, str]:
+    """Render the homepage, split in pages of ``PAGE_SIZE`` projects by name.
+
+    Each page links to the first, previous, next and last page, and to the
+    first project of every letter, so its size does not depend on the number
+    of projects. The search box above the listing looks projects up in the
+    search index.
+    :param script_url:
+        The url of the script of the search box.
+    :param search_url:
+        The url of the manifest of the search index.
+    :return:
+        The pages by their path, relative to the site.
+    """
+
+    projects = sorted((p for p in index.projects if len(index.releases[p.id]) > 0), key=lambda p: canonicalize_name(p.name))
+    count = max(math.ceil(len(projects) / PAGE_SIZE), 1)
+
+    first_pages: dict[str, int] = {}
+    for i, project in enumerate(projects):
+        first_pages.setdefault(letter(project), i // PAGE_SIZE + 1)
+
+    template = compile_template(Template.HOMEPAGE).bind(
+        {
+            'WAREHUB_VERSION': warehub.__version__,
+            'STYLE': style(Template.STYLE + STYLE),
+            'URL': Config.url,
+            'TITLE': Config.title,
+            'DESCRIPTION': Config.description,
+            'IMAGE': Config.image_url,
+        }
+    )
+
+    indent = ' ' * 4
+    pages = {}
+    for number in range(1, count + 1):
+        listing = f'\n{indent}<div class="listing">'
+        for i, project in enumerate(projects[(number - 1) * PAGE_SIZE:number * PAGE_SIZE], (number - 1) * PAGE_SIZE):
+            anchor = letter(project)
+            first = i == 0 or letter(projects[i - 1]) != anchor
+            listing += card(project, latest_release(index.releases[project.id]), anchor if first else None)
+        listing += f'\n{indent}</div>'
+
+        if count > 1:
+            listing = letters_navigation(first_pages) + navigation(number, count) + listing + navigation(number, count)
+        listing = search_box(script_url, search_url) + listing
+
+        pages[page_file(number)] = template.render({'PACKAGES': listing})
+    return pages
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Type
+
+from warehub.database import ComparisonType, Database, TableType
+import warehub.model  # Defines the tables the entries are decoded to
+
+# Journal size past which it is folded back into the database file
+COMPACT_SIZE = 4 * 1024 * 1024
+
+_get = Database._get.__func__
+_put = Database.put.__func__
+
+journal: Optional['Journal'] = None
+
+
+def encode(value: Any) -> str:
+    return json.dumps(value, default=Database._encode)
+
+
+class Journal:
+    """Changes to the database appended to a file next to it.
+
+    warehub writes the whole database on every commit. Instead, a commit only
+    appends the entries that changed as JSON lines, and loading replays them
+    over the database file. Once the journal grows past ``compact_size`` it
+    is folded back into the database file by a background thread.
+
+    Replaying an entry twice has no effect, so a journal that was only
+    partly folded back, or whose last line was cut off, still loads.
+    """
+
+    def __init__(self, file: Path, compact_size: int = COMPACT_SIZE):
+        self.database_file: Path = file
+        self.file: Path = file.with_suffix('.journal.jsonl')
+        self.compact_size: int = compact_size
+        self.lock: threading.Lock = threading.Lock()
+        self.compaction: Optional[threading.Thread] = None
+
+        # Encoding of every entry as last written, by table and id
+        self.stored: dict[str, dict[str, str]] = {}
+        # Entries handed out or put since the last commit
+        self.touched: set[tuple[str, str]] = set()
+
+    def load(self) -> dict[str, Any]:
+        try:
+            data = json.loads(self.database_file.read_text(), object_hook=Database._decode)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            data = {'last_commit': datetime.now()}
+
+        try:
+            with self.file.open() as fp:
+                for line in fp:
+                    try:
+                        change = json.loads(line, object_hook=Database._decode)
+                    except json.decoder.JSONDecodeError:
+                        # Cut off while being written
+                        break
+                    if 'last_commit' in change:
+                        data['last_commit'] = change['last_commit']
+                    else:
+                        data.setdefault(change['table'], {})[change['id']] = change['entry']
+        except FileNotFoundError:
+            pass
+
+        self.stored = {
+            name: {id: encode(entry) for id, entry in table.items()}
+            for name, table in data.items()
+            if name != 'last_commit'
+        }
+        self.touched = set()
+        return data
+
+    def touch(self, table: str, ids: list[str]) -> None:
+        self.touched.update((table, id) for id in ids)
+
+    def append(self, data: dict[str, Any]) -> None:
+        # Keep the order of the tables and of their entries, as warehub does
+        order = {name: i for i, name in enumerate(data)}
+        for name in order:
+            if name != 'last_commit':
+                self.stored.setdefault(name, {})
+
+        lines = []
+        for name, id in sorted(self.touched, key=lambda t: (order.get(t[0], len(order)), int(t[1]))):
+            if (entry := data.get(name, {}).get(id)) is None:
+                continue
+            if self.stored.get(name, {}).get(id) != (encoded := encode(entry)):
+                lines.append(f'{{"table": {json.dumps(name)}, "id": {json.dumps(id)}, "entry": {encoded}}}\n')
+                self.stored.setdefault(name, {})[id] = encoded
+        lines.append(encode({'last_commit': data['last_commit']}) + '\n')
+
+        with self.lock:
+            with self.file.open('a') as fp:
+                fp.write(''.join(lines))
+                fp.flush()
+                os.fsync(fp.fileno())
+            size = self.file.stat().st_size
+        self.touched = set()
+
+        if size > self.compact_size and (self.compaction is None or not self.compaction.is_alive()):
+            # Folded back from the encodings, which are only ever replaced
+            # and not changed, so the thread does not need the database.
+            tables = {name: dict(table) for name, table in self.stored.items()}
+            self.compaction = threading.Thread(target=self.compact, args=(data['last_commit'], tables, size))
+            self.compaction.start()
+
+    def compact(self, last_commit: datetime, tables: dict[str, dict[str, str]], size: int) -> None:
+        # Same layout as warehub writes
+        data = {'last_commit': last_commit}
+        data.update({name: {id: json.loads(e) for id, e in table.items()} for name, table in tables.items()})
+        temp = self.database_file.with_name(f'{self.database_file.name}.tmp')
+        temp.write_text(json.dumps(data, indent=2, default=Database._encode))
+        os.replace(temp, self.database_file)
+
+        # Only drop the part of the journal that is now in the database file,
+        # commits made in the meantime are kept
+        with self.lock:
+            with self.file.open('rb') as fp:
+                fp.seek(size)
+                rest = fp.read()
+            temp = self.file.with_name(f'{self.file.name}.tmp')
+            temp.write_bytes(rest)
+            os.replace(temp, self.file)
+
+
+def _rollback_journal(cls: Type[Database]) -> None:
+    cls._data = journal.load()
+
+
+def _commit_journal(cls: Type[Database]) -> bool:
+    if cls._data is None:
+        cls.rollback()
+
+    previous_commit = cls._data.get('last_commit')
+    try:
+        cls._data['last_commit'] = datetime.now()
+        journal.append(cls._data)
+        return True
+    except OSError as e:
+        cls._data['last_commit'] = datetime.now() if previous_commit is None else previous_commit
+        print(f'I/O error({e.errno}): {e.strerror}')
+    return False
+
+
+def _get_journal(cls: Type[Database], table: Type[TableType], where: ComparisonType = None) -> list[tuple[str, TableType]]:
+    results = _get(cls, table, where)
+    # Entries handed out may be changed before the next commit
+    journal.touch(table.__name__.lower(), [id for id, _ in results])
+    return results
+
+
+def _put_journal(cls: Type[Database], table: Type[TableType], *entries: TableType) -> None:
+    _put(cls, table, *entries)
+    journal.touch(table.__name__.lower(), [str(e.id) for e in entries])
+
+
+def configure(compact_size: int = COMPACT_SIZE) -> None:
+    """Journal the changes to warehub's JSON database."""
+
+    global journal
+    journal = Journal(Database.file(), compact_size)
+
+    Database._data = None
+    Database.rollback = classmethod(_rollback_journal)
+    Database.commit = classmethod(_commit_journal)
+    Database._get = classmethod(_get_journal)
+    Database.put = classmethod(_put_journal)
+
+
+def compact(file: Path) -> None:
+    """Fold the whole journal of a database file back into it."""
+
+    if not (pending := Journal(file)).file.exists():
+        return
+    data = pending.load()
+    pending.compact(data['last_commit'], pending.stored, pending.file.stat().st_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold the journal of a JSON package database back into it.')
+    parser.add_argument('database', type=Path, help='the JSON database file')
+    args = parser.parse_args()
+
+    compact(args.database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import gzip
+import logging
+from pathlib import Path, PurePath
+from typing import Callable
+
+import warehub
+from warehub.model import Directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(warehub.__title__)
+
+EXTENSIONS = ('.html', '.json', '.css', '.js', '.svg')
+SUFFIXES = ('.gz', '.br')
+
+# Below this size compressing gains less than a round trip
+MIN_SIZE = 1024
+
+
+def applies(relative: PurePath) -> bool:
+    """Whether a file of the site, relative to its root, is a page.
+
+    Pages are the HTML and JSON files of the site, and the shared assets
+    they use, leaving out the database next to the homepage and everything
+    under ``files``.
+    """
+
+    if relative.suffix not in EXTENSIONS:
+        return False
+    if len(relative.parts) == 1:
+        return relative.name == 'index.html'
+    return relative.parts[0] != Directory.FILES and not relative.parts[0].startswith('.')
+
+
+def siblings(file: Path) -> list[Path]:
+    return [file.with_name(file.name + s) for s in SUFFIXES]
+
+
+def gzip_compress(data: bytes) -> bytes:
+    # No name and a zero mtime, so the same page always compresses the same
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+class Precompressor:
+    """Compressed siblings of the pages, for servers that send them as is."""
+
+    def __init__(self, min_size: int = MIN_SIZE):
+        self.min_size: int = min_size
+        self.compressors: dict[str, Callable[[bytes], bytes]] = {'.gz': gzip_compress}
+        if brotli is not None:
+            self.compressors['.br'] = brotli_compress
+        else:
+            logger.warning('brotli is not installed, only writing .gz files')
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(min_size={self.min_size}, suffixes={list(self.compressors)})'
+
+    def siblings(self, file: Path) -> dict[Path, Callable[[bytes], bytes]]:
+        return {file.with_name(file.name + s): c for s, c in self.compressors.items()}
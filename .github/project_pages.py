@@ -0,0 +1,270 @@
+import email.message
+import functools
+import io
+import json
+from collections import defaultdict
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any, Optional
+
+import readme_renderer.markdown
+import readme_renderer.rst
+import warehub
+from warehub.config import Config
+from warehub.model import Directory, File, Project, Release, Template
+
+from templates import CompiledTemplate, compile_template, style
+
+if TYPE_CHECKING:
+    from generate_site import Index
+
+RENDERERS = {
+    'text/plain': None,
+    'text/x-rst': readme_renderer.rst,
+    'text/markdown': readme_renderer.markdown,
+}
+
+# The fields of the meta section, in the order they are shown
+META = (
+    ('License', 'license'),
+    ('Author', 'author'),
+    ('Maintainer', 'maintainer'),
+    ('Requires', 'requires_python'),
+    ('Platform', 'platform'),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def site_template(source: str, site_style: str, url: str, title: str, image_url: str) -> CompiledTemplate:
+    return compile_template(source).bind(
+        {
+            'WAREHUB_VERSION': warehub.__version__,
+            'STYLE': style(site_style),
+            'URL': url,
+            'TITLE': title,
+            'IMAGE': image_url,
+        }
+    )
+
+
+def release_template() -> CompiledTemplate:
+    """The release page template, with everything that is the same on every page filled in."""
+
+    return site_template(Template.RELEASE, Template.STYLE, Config.url, Config.title, Config.image_url)
+
+
+def parse_content_type(value: str) -> tuple[str, dict[str, str]]:
+    message = email.message.Message()
+    message['Content-Type'] = value
+    params = message.get_params() or [('', '')]
+    return params[0][0], {k: v for k, v in params[1:] if k}
+
+
+def render_description(release: Release) -> str:
+    description = release.description.get('raw')
+    content_type, params = parse_content_type(release.description.get('content_type') or '')
+    renderer = RENDERERS.get(content_type, readme_renderer.rst)
+
+    if description in {None, 'UNKNOWN\n\n\n'}:
+        return ''
+    if renderer:
+        return renderer.render(description, **params) or ''
+    return description
+
+
+def render_links(release: Release) -> str:
+    indent = ' ' * 20
+    return ''.join(f'\n{indent}<li><a href="{url}" rel="nofollow">{name}</a></li>' for name, url in release.urls.items())
+
+
+def render_meta(release: Release) -> str:
+    values = {
+        'Author': f'<a href="mailto:{release.author_email}">{release.author}</a>',
+        'Maintainer': f'<a href="mailto:{release.maintainer_email}">{release.maintainer}</a>',
+    }
+    indent = ' ' * 16
+    meta = ''
+    for name, attribute in META:
+        if (value := getattr(release, attribute)) is not None:
+            meta += f'\n{indent}<p class="elem"><strong>{name}: </strong>{values.get(name, value)}</p>'
+    return meta
+
+
+def render_classifiers(release: Release) -> str:
+    classifiers: defaultdict[str, list[str]] = defaultdict(list)
+    for classifier in release.classifiers:
+        group, tag = classifier.split(' :: ', 1)
+        classifiers[group].append(tag)
+
+    rendered = ''
+    for group, tags in classifiers.items():
+        indent = ' ' * 28
+        tags_str = ''.join(f'\n{indent}<li>{tag}</li>' for tag in sorted(tags))
+        indent = ' ' * 20
+        rendered += (
+            f'\n{indent}<li>'
+            f'\n{indent}    <strong>{group}</strong>'
+            f'\n{indent}    <ul>{tags_str}'
+            f'\n{indent}    </ul>'
+            f'\n{indent}</li>'
+        )
+    return rendered
+
+
+def render_release_cards(project: Project, releases: list[Release]) -> str:
+    indent = ' ' * 16
+    return ''.join(
+        f'\n{indent}<a class="card" href="{Config.url}{Directory.PROJECT}/{project.name}/{r.version}/">'
+        f'\n{indent}    <span class="version">{r.version}</span>'
+        f'\n{indent}</a>'
+        for r in releases
+    )
+
+
+def render_file_cards(files: list[File]) -> str:
+    indent = ' ' * 16
+    return ''.join(
+        f'\n{indent}<a class="card" href="{Config.url}{Directory.FILES}/{f.name}">'
+        f'\n{indent}    {f.name}'
+        f'\n{indent}</a>'
+        for f in files
+    )
+
+
+def release_page(
+    index: 'Index',
+    project: Project,
+    release: Release,
+    description: str,
+    release_cards: str,
+    show_version: bool = False,
+) -> str:
+    out = io.StringIO()
+    release_template().render_into(
+        out,
+        {
+            'NAME': project.name,
+            'VERSION': release.version,
+            'PIP_VERSION': f'=={release.version}' if show_version else '',
+            'SUMMARY': release.summary or '',
+            'LINKS': render_links(release),
+            'META': render_meta(release),
+            'CLASSIFIERS': render_classifiers(release),
+            'DESCRIPTION': description,
+            'RELEASES': release_cards,
+            'FILES': render_file_cards(index.files[release.id]),
+        },
+    )
+    return out.getvalue()
+
+
+def file_json(release: Release, file: File) -> dict[str, Any]:
+    return {
+        'filename': file.name,
+        'python_version': file.python_version,
+        'packagetype': file.package_type,
+        'comment_text': file.comment_text,
+        'size': file.size,
+        'has_sig': file.has_signature,
+        'md5_digest': file.md5_digest,
+        'digests': {
+            'md5': file.md5_digest,
+            'sha256': file.sha256_digest,
+            'blake2_256': file.blake2_256_digest,
+        },
+        'downloads': -1,
+        'upload_time': file.upload_time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'upload_time_iso_8601': file.upload_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        'url': f'{Config.url}{Directory.FILES}/{file.name}',
+        'requires_python': release.requires_python if release.requires_python else None,
+        'yanked': release.yanked,
+        'yanked_reason': release.yanked_reason or None,
+    }
+
+
+def json_page(project: Project, release: Release, releases: dict[str, list[dict[str, Any]]]) -> str:
+    """The PyPI JSON API page of a release, laid out like warehub writes it."""
+
+    return json.dumps(
+        {
+            'info': {
+                'name': project.name,
+                'version': release.version,
+                'summary': release.summary,
+                'description_content_type': release.description['content_type'],
+                'description': release.description['raw'],
+                'keywords': release.keywords,
+                'license': release.license,
+                'classifiers': release.classifiers,
+                'author': release.author,
+                'author_email': release.author_email,
+                'maintainer': release.maintainer,
+                'maintainer_email': release.maintainer_email,
+                'requires_python': release.requires_python,
+                'platform': release.platform,
+                'downloads': {
+                    'last_day': -1,
+                    'last_week': -1,
+                    'last_month': -1,
+                },
+                'package_url': f'{Config.url}{Directory.PROJECT}/{project.name}',
+                'project_url': f'{Config.url}{Directory.PROJECT}/{project.name}',
+                'project_urls': release.urls,
+                'release_url': f'{Config.url}{Directory.PROJECT}/{project.name}/{release.version}',
+                'requires_dist': release.dependencies['requires_dist'],
+                'docs_url': None,
+                'bugtrack_url': None,
+                'home_page': release.home_page,
+                'download_url': release.download_url,
+                'yanked': release.yanked,
+                'yanked_reason': release.yanked_reason or None,
+            },
+            'urls': releases[release.version],
+            'releases': releases,
+            'vulnerabilities': [],
+            'last_serial': -1,
+        },
+        indent=4,
+    )
+
+
+def render_project(index: 'Index', project: Project) -> dict[PurePosixPath, str]:
+    """Render the release pages and the JSON API pages of a project.
+
+    The pages match the ones of ``warehub.command.generate``, except that the
+    meta section is always in the same order. Every description is rendered
+    once, even when it is shown on both the project and the release page.
+    :return:
+        The pages by their path, relative to the site.
+    """
+
+    releases = index.releases[project.id]
+    if len(releases) < 1:
+        return {}
+
+    pages: dict[PurePosixPath, str] = {}
+    project_directory = PurePosixPath(Directory.PROJECT, project.name)
+    release_cards = render_release_cards(project, releases)
+    descriptions: dict[int, str] = {}
+
+    latest = releases[0]
+    for release in releases:
+        if release.version > latest.version:
+            latest = release
+        descriptions[release.id] = render_description(release)
+        page = release_page(index, project, release, descriptions[release.id], release_cards, True)
+        pages[project_directory / release.version / 'index.html'] = page
+    pages[project_directory / 'index.html'] = release_page(
+        index, project, latest, descriptions[latest.id], release_cards
+    )
+
+    files = {r.version: [file_json(r, f) for f in index.files[r.id]] for r in releases}
+    pypi_directory = PurePosixPath(Directory.PYPI, project.name)
+    latest_available: Optional[Release] = None
+    for release in releases:
+        if not release.yanked:
+            if latest_available is None or release.version > latest_available.version:
+                latest_available = release
+            pages[pypi_directory / release.version / 'json' / 'index.json'] = json_page(project, release, files)
+    if latest_available is not None:
+        pages[pypi_directory / 'json' / 'index.json'] = json_page(project, latest_available, files)
+    return pages
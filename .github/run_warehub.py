@@ -1,18 +1,26 @@
-import json
-import os
 import re
 from dataclasses import dataclass
 from typing import Optional
 
-import warehub.command
+import github_event
 
 
 @dataclass(frozen=True)
 class Arguments:
-    repository: str
+    repositories: tuple[str, ...]
     domain: Optional[str] = None
     username: Optional[str] = None
     password: Optional[str] = None
+    plan: Optional[str] = None
+
+    def __post_init__(self):
+        if len(self.repositories) == 0:
+            raise ValueError('No repository given')
+        for repository in self.repositories:
+            if re.fullmatch(r'[\w.-]+/[\w.-]+', repository) is None:
+                raise ValueError(f'Repository must be in the form <user>/<repo_name>: {repository}')
+        if self.plan is not None and self.plan.lower() not in ('yes', 'no'):
+            raise ValueError(f'Plan must be yes or no: {self.plan}')
 
     def args(self) -> list[str]:
         args: list[str] = []
@@ -22,23 +30,50 @@ class Arguments:
             args.extend([f'--username', self.username])
         if self.password is not None:
             args.extend([f'--password', self.password])
-        args.append(self.repository)
+        if self.plan is not None and self.plan.lower() == 'yes':
+            args.append('--plan')
+        args.extend(self.repositories)
         return args
 
 
+def parse_form(body: str) -> dict[str, list[str]]:
+    form: dict[str, list[str]] = {}
+    values: Optional[list[str]] = None
+    fenced = False
+    for line in re.sub(r'<!--.*?-->', '', body, flags=re.DOTALL).replace('\r', '').split('\n'):
+        if line.strip().startswith('```'):
+            fenced = not fenced
+            continue
+        if fenced:
+            value = line
+        elif (match := re.match(r'- \*\*(\w+):\*\*\s*(.*)', line)) is not None:
+            values = form.setdefault(match.group(1).lower().strip(), [])
+            value = match.group(2)
+        elif (match := re.match(r'\s+[-*]\s+(.*)', line)) is not None:
+            value = match.group(1)
+        else:
+            continue
+        if values is not None and (value := value.strip()) != '':
+            values.append(value)
+    return form
+
+
 def main():
-    context = json.loads(os.environ['GITHUB_CONTEXT'])
+    form = parse_form(github_event.issue_body())
+
+    repositories: list[str] = []
+    for value in form.pop('repository', []):
+        repositories.extend(r for r in re.split(r'[\s,]+', value) if r != '')
+
+    args: dict[str, str] = {name: values[0] for name, values in form.items() if len(values) > 0}
 
-    args: dict[str, str] = {}
-    for line in context['event']['issue']['body'].replace('\r', '').split('\n'):
-        if (match := re.match(r'- \*\*(\w+):\*\*\s*(.*)', line)) is not None:
-            name = match.group(1).lower().strip()
-            if (value := match.group(2).strip()) != '':
-                args[name] = value
+    arguments: Arguments = Arguments(tuple(dict.fromkeys(repositories)), **args)
 
-    arguments: Arguments = Arguments(**args)
+    # Only imported once the form is valid, as it pulls in warehub, requests
+    # and the page renderers
+    import add_packages
 
-    warehub.command.add(['--verbose'] + arguments.args())
+    add_packages.add(['--verbose'] + arguments.args())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,169 @@
+import hashlib
+import json
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any
+
+from packaging.utils import canonicalize_name
+from warehub.config import Config
+from warehub.model import Directory, Project
+
+import homepage
+import precompress
+from site_writer import SiteWriter
+
+if TYPE_CHECKING:
+    from generate_site import Index
+
+# Written to search/, with one shard of the index for every first letter
+DIRECTORY = 'search'
+MANIFEST_FILE = 'index.json'
+
+GRAM_SIZE = 3
+
+SCRIPT = r'''(function () {
+    'use strict';
+
+    const LIMIT = 50;
+    const GRAM_SIZE = %%GRAM_SIZE%%;
+    const manifest = new URL(document.currentScript.dataset.index, document.baseURI);
+    const input = document.getElementById('search');
+    const results = document.getElementById('search-results');
+    let loading = null;
+
+    // The shards are only fetched once the search box is used
+    function load() {
+        if (loading === null) {
+            loading = fetch(manifest)
+                .then(response => response.json())
+                .then(index => Promise.all(
+                    Object.entries(index.shards).map(([key, digest]) =>
+                        fetch(new URL(key + '.json?' + digest, manifest)).then(response => response.json()))
+                ).then(shards => ({url: index.url, shards: shards})));
+        }
+        return loading;
+    }
+
+    function normalize(text) {
+        return text.trim().toLowerCase().replace(/[-_.\s]+/g, '-');
+    }
+
+    function candidates(shard, query) {
+        if (query.length < GRAM_SIZE) {
+            return shard.names.map((_, i) => i);
+        }
+        let found = null;
+        for (let i = 0; i + GRAM_SIZE <= query.length; i++) {
+            const postings = new Set(shard.grams[query.slice(i, i + GRAM_SIZE)] || []);
+            found = found === null ? [...postings] : found.filter(i => postings.has(i));
+        }
+        return found;
+    }
+
+    function search(index, query) {
+        const found = [];
+        for (const shard of index.shards) {
+            for (const i of candidates(shard, query)) {
+                const name = normalize(shard.names[i]);
+                if (name.includes(query)) {
+                    const rank = name === query ? 0 : name.startsWith(query) ? 1 : 2;
+                    found.push({rank: rank, shard: shard, i: i});
+                }
+            }
+        }
+        found.sort((a, b) => a.rank - b.rank || a.shard.names[a.i].localeCompare(b.shard.names[b.i]));
+        return found.slice(0, LIMIT);
+    }
+
+    function span(className, text) {
+        const element = document.createElement('span');
+        element.className = className;
+        element.textContent = text;
+        return element;
+    }
+
+    function card(url, shard, i) {
+        const element = document.createElement('a');
+        element.className = 'card';
+        element.href = url + shard.names[i] + '/';
+        element.append(shard.names[i], span('version', shard.versions[i]), span('description', shard.summaries[i]));
+        return element;
+    }
+
+    function update() {
+        const query = normalize(input.value);
+        document.body.classList.toggle('searching', query !== '');
+        if (query === '') {
+            results.replaceChildren();
+            return;
+        }
+        load().then(index => {
+            if (normalize(input.value) === query) {
+                results.replaceChildren(...search(index, query).map(r => card(index.url, r.shard, r.i)));
+            }
+        });
+    }
+
+    input.addEventListener('focus', load, {once: true});
+    input.addEventListener('input', update);
+})();
+'''.replace('%%GRAM_SIZE%%', str(GRAM_SIZE))
+
+
+def shard_key(project: Project) -> str:
+    letter = homepage.letter(project)
+    return '0' if letter == '#' else letter.lower()
+
+
+def grams(name: str) -> set[str]:
+    return {name[i:i + GRAM_SIZE] for i in range(len(name) - GRAM_SIZE + 1)}
+
+
+def render_shard(index: 'Index', projects: list[Project]) -> str:
+    names, versions, summaries = [], [], []
+    postings: defaultdict[str, list[int]] = defaultdict(list)
+    for i, project in enumerate(sorted(projects, key=lambda p: canonicalize_name(p.name))):
+        latest = homepage.latest_release(index.releases[project.id])
+        names.append(project.name)
+        versions.append(latest.version)
+        summaries.append(latest.summary or '')
+        for gram in sorted(grams(canonicalize_name(project.name))):
+            postings[gram].append(i)
+    shard = {'names': names, 'versions': versions, 'summaries': summaries, 'grams': dict(sorted(postings.items()))}
+    return json.dumps(shard, separators=(',', ':'))
+
+
+def write(writer: SiteWriter, index: 'Index', digests: dict[str, str], previous: dict[str, str]) -> dict[str, str]:
+    """Write the search index of the homepage, split in shards by first letter.
+
+    Only the shards with a project that changed, was added or was removed
+    are rendered again.
+    :param digests:
+        The digest of every project.
+    :param previous:
+        The digest of every shard, as returned by the previous run.
+    :return:
+        The digest of every shard.
+    """
+
+    shards: defaultdict[str, list[Project]] = defaultdict(list)
+    for project in index.projects:
+        if len(index.releases[project.id]) > 0:
+            shards[shard_key(project)].append(project)
+
+    directory = Config.path / DIRECTORY
+    shard_digests: dict[str, str] = {}
+    for key, projects in sorted(shards.items()):
+        members = sorted((p.name, digests[p.name]) for p in projects)
+        shard_digests[key] = hashlib.sha256(json.dumps(members).encode()).hexdigest()[:16]
+        if shard_digests[key] != previous.get(key) or not (directory / f'{key}.json').exists():
+            writer.write(directory / f'{key}.json', render_shard(index, projects))
+
+    manifest: dict[str, Any] = {'url': f'{Config.url}{Directory.PROJECT}/', 'shards': shard_digests}
+    writer.write(directory / MANIFEST_FILE, json.dumps(manifest, separators=(',', ':')))
+
+    # Shards of letters without projects
+    expected = {MANIFEST_FILE, *(f'{key}.json' for key in shard_digests)}
+    for file in list(directory.iterdir()):
+        if file.name not in expected and not file.name.endswith(precompress.SUFFIXES):
+            writer.delete(file)
+    return shard_digests
@@ -0,0 +1,158 @@
+import hashlib
+import html
+import json
+import logging
+import zipfile
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+import warehub
+from packaging.utils import canonicalize_name
+from warehub.config import Config
+from warehub.model import Directory, File, Project, Release, Template
+
+import wheel_metadata
+from templates import compile_template
+
+if TYPE_CHECKING:
+    from generate_site import Index
+    from site_writer import SiteWriter
+
+logger = logging.getLogger(warehub.__title__)
+
+# PEP 691 with the sizes, upload times and versions of PEP 700
+API_VERSION = '1.1'
+CONTENT_TYPE = 'application/vnd.pypi.simple.v1+json'
+
+# Written next to the index.html of the same page, as static hosting can not
+# choose the document by the Accept header
+JSON_FILE = 'index.json'
+
+
+def dumps(document: dict[str, Any]) -> str:
+    return json.dumps(document, separators=(',', ':'))
+
+
+def yanked(release: Release) -> Union[bool, str]:
+    if not release.yanked:
+        return False
+    return release.yanked_reason or True
+
+
+def file_url(file: File) -> str:
+    return f'{Config.url}{Directory.FILES}/{file.name}'
+
+
+def core_metadata_hash(file: File, writer: 'SiteWriter') -> Optional[str]:
+    """The sha256 digest of the PEP 658 metadata file of a wheel.
+
+    Wheels added before metadata files were written get one here, through
+    ``writer`` like every other file of the site.
+    """
+
+    if not file.name.endswith('.whl'):
+        return None
+    path = Config.path / Directory.FILES / file.name
+    if (sidecar := wheel_metadata.sidecar(path)).exists():
+        metadata = sidecar.read_bytes()
+    else:
+        try:
+            metadata = wheel_metadata.read_metadata(path)
+        except (OSError, zipfile.BadZipFile) as e:
+            logger.warning(f'No core metadata for {file.name}: {e}')
+            return None
+        writer.write(sidecar, metadata)
+    return hashlib.sha256(metadata).hexdigest()
+
+
+def file_entry(release: Release, file: File, metadata_hash: Optional[str]) -> dict[str, Any]:
+    entry: dict[str, Any] = {
+        'filename': file.name,
+        'url': file_url(file),
+        'hashes': {'sha256': file.sha256_digest} if file.sha256_digest else {},
+    }
+    if release.requires_python:
+        entry['requires-python'] = release.requires_python
+    if metadata_hash is not None:
+        # PEP 714 renamed the key, older clients only know the first one
+        entry['dist-info-metadata'] = {'sha256': metadata_hash}
+        entry['core-metadata'] = {'sha256': metadata_hash}
+    entry['gpg-sig'] = file.has_signature
+    entry['yanked'] = yanked(release)
+    entry['size'] = file.size
+    entry['upload-time'] = file.upload_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return entry
+
+
+def file_link(release: Release, file: File, metadata_hash: Optional[str]) -> str:
+    attributes = f'href="{file_url(file)}"'
+    if release.requires_python:
+        attributes += f' data-requires-python="{html.escape(release.requires_python)}"'
+    if release.yanked:
+        # PEP 592, files of yanked releases are still listed for pinned installs
+        attributes += f' data-yanked="{html.escape(release.yanked_reason or "")}"'
+    if metadata_hash is not None:
+        attributes += f' data-dist-info-metadata="sha256={metadata_hash}" data-core-metadata="sha256={metadata_hash}"'
+    return f'\n    <a {attributes}>{file.name}</a><br/>'
+
+
+def html_page(links: str) -> str:
+    return compile_template(Template.SIMPLE).render(
+        {
+            'WAREHUB_VERSION': warehub.__version__,
+            'TITLE': Config.title,
+            'IMAGE': Config.image_url,
+            'LIST': links,
+        }
+    )
+
+
+def project_page(index: 'Index', project: Project, metadata_hashes: dict[str, Optional[str]]) -> str:
+    links = ''
+    for release in index.releases[project.id]:
+        for file in index.files[release.id]:
+            links += file_link(release, file, metadata_hashes[file.name])
+    return html_page(links)
+
+
+def project_document(index: 'Index', project: Project, metadata_hashes: dict[str, Optional[str]]) -> str:
+    releases = index.releases[project.id]
+    return dumps(
+        {
+            'meta': {'api-version': API_VERSION},
+            'name': canonicalize_name(project.name),
+            'files': [file_entry(r, f, metadata_hashes[f.name]) for r in releases for f in index.files[r.id]],
+            'versions': [r.version for r in releases],
+        }
+    )
+
+
+def index_document(index: 'Index') -> str:
+    return dumps(
+        {
+            'meta': {'api-version': API_VERSION},
+            'projects': [{'name': p.name} for p in index.projects if len(index.releases[p.id]) > 0],
+        }
+    )
+
+
+def render_project(index: 'Index', project: Project, writer: 'SiteWriter') -> dict[PurePosixPath, str]:
+    """Render the simple pages of a project, as HTML and JSON.
+
+    Metadata files missing for its wheels are written with ``writer``.
+
+    :return:
+        The pages by their path, relative to the site.
+    """
+
+    if len(index.releases[project.id]) < 1:
+        return {}
+    metadata_hashes = {
+        f.name: core_metadata_hash(f, writer) for r in index.releases[project.id] for f in index.files[r.id]
+    }
+
+    directory = PurePosixPath(Directory.SIMPLE, project.name)
+    return {
+        directory / 'index.html': project_page(index, project, metadata_hashes),
+        directory / JSON_FILE: project_document(index, project, metadata_hashes),
+    }
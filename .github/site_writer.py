@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path, PurePosixPath
+from typing import Mapping, Optional, Union
+
+from warehub.utils import delete_path
+
+import precompress
+from precompress import Precompressor
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file: Path) -> bytes:
+    sha256 = hashlib.sha256()
+    with file.open('rb') as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.digest()
+
+
+class SiteWriter:
+    """Writes the files of the site, leaving the ones that did not change alone.
+
+    A file is only written if its size or, for the same size, its sha256
+    digest differs from the file on disk. Changed files are written to a
+    temporary file first and moved into place, so readers never see a half
+    written page. The paths that were written or deleted are kept for the
+    manifest.
+
+    With a precompressor, the compressed siblings of a page are written
+    together with it, and only compressed again when the page changed or a
+    sibling is missing.
+    """
+
+    def __init__(self, root: Path, precompressor: Optional[Precompressor] = None):
+        self.root: Path = root
+        self.precompressor: Optional[Precompressor] = precompressor
+        self.written: set[str] = set()
+        self.deleted: set[str] = set()
+        self.lock: threading.Lock = threading.Lock()
+
+    def relative(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def unchanged(self, path: Path, data: bytes) -> bool:
+        try:
+            if path.stat().st_size != len(data):
+                return False
+        except FileNotFoundError:
+            return False
+        return file_sha256(path) == hashlib.sha256(data).digest()
+
+    def write(self, path: Path, data: Union[str, bytes]) -> bool:
+        """Write ``data`` to ``path`` unless the file already holds it.
+
+        :return:
+            Whether the file was written.
+        """
+
+        if isinstance(data, str):
+            data = data.encode()
+        changed = self.replace(path, data)
+
+        if self.compressed(path):
+            for sibling, compress in self.precompressor.siblings(path).items():
+                if len(data) < self.precompressor.min_size:
+                    self.delete(sibling)
+                elif changed or not sibling.exists():
+                    self.replace(sibling, compress(data))
+        return changed
+
+    def replace(self, path: Path, data: bytes) -> bool:
+        if self.unchanged(path, data):
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            temp.write_bytes(data)
+            os.replace(temp, path)
+        finally:
+            temp.unlink(missing_ok=True)
+        with self.lock:
+            self.written.add(self.relative(path))
+        return True
+
+    def compressed(self, path: Path) -> bool:
+        return self.precompressor is not None and precompress.applies(path.relative_to(self.root))
+
+    def delete(self, path: Path) -> None:
+        if precompress.applies(path.relative_to(self.root)):
+            for sibling in precompress.siblings(path):
+                self.delete(sibling)
+
+        if not path.exists():
+            return
+        with self.lock:
+            if path.is_dir():
+                self.deleted.update(self.relative(f) for f in path.rglob('*') if not f.is_dir())
+            else:
+                self.deleted.add(self.relative(path))
+        delete_path(path)
+
+    def sync(self, target: Path, files: Mapping[PurePosixPath, Union[str, bytes]]) -> None:
+        """Make the directory ``target`` hold exactly ``files``, by their path relative to it."""
+
+        if len(files) == 0:
+            self.delete(target)
+            return
+
+        expected = set(files)
+        for file in files:
+            if self.compressed(target / file):
+                expected.update(s.relative_to(target) for s in self.precompressor.siblings(target / file))
+        if target.exists():
+            for file in list(target.rglob('*')):
+                if file.is_file() and file.relative_to(target) not in expected:
+                    self.delete(file)
+        for file in sorted(files):
+            self.write(target / file, files[file])
+
+        # Directories of pages that are gone, like removed versions
+        for directory in sorted(target.rglob('*'), reverse=True):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+
+    def save_manifest(self, file: Path) -> None:
+        manifest = {
+            'written': sorted(self.written),
+            'deleted': sorted(self.deleted - self.written),
+        }
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps(manifest, indent=2))
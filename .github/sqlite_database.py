@@ -0,0 +1,374 @@
+import argparse
+import json
+import sqlite3
+from collections.abc import Iterator, MutableMapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional, Type
+
+from packaging.utils import canonicalize_name
+from warehub.database import Comparison, ComparisonType, Database, TableField, TableType
+from warehub.model import File, FileName, Project, Release
+
+import journal_database
+
+SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS project (id INTEGER PRIMARY KEY, normalized_name TEXT NOT NULL, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS release (
+    id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL, version TEXT NOT NULL, data TEXT NOT NULL,
+    UNIQUE (project_id, version)
+);
+CREATE TABLE IF NOT EXISTS file (id INTEGER PRIMARY KEY, release_id INTEGER NOT NULL, name TEXT NOT NULL UNIQUE, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS filename (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS project_normalized_name ON project (normalized_name);
+CREATE INDEX IF NOT EXISTS release_project_id ON release (project_id);
+CREATE INDEX IF NOT EXISTS file_release_id ON file (release_id);
+'''
+
+# The indexed columns of each table, besides the id and the encoded entry
+COLUMNS: dict[str, dict[str, Callable[[Any], Any]]] = {
+    Project.__name__.lower(): {'normalized_name': lambda p: canonicalize_name(p.name)},
+    Release.__name__.lower(): {'project_id': lambda r: r.project_id, 'version': lambda r: r.version},
+    File.__name__.lower(): {'release_id': lambda f: f.release_id, 'name': lambda f: f.name},
+    FileName.__name__.lower(): {'name': lambda f: f.name},
+}
+
+# The indexed column that an equality query on a field of each table is
+# looked up by, and how the queried value is stored in it
+LOOKUPS: dict[str, dict[str, tuple[str, Callable[[Any], Any]]]] = {
+    Project.__name__.lower(): {'name': ('normalized_name', canonicalize_name)},
+    Release.__name__.lower(): {'project_id': ('project_id', int), 'version': ('version', str)},
+    File.__name__.lower(): {'release_id': ('release_id', int), 'name': ('name', str)},
+    FileName.__name__.lower(): {'name': ('name', str)},
+}
+
+_field_eq = TableField.__eq__
+_comparison_and = Comparison.__and__
+
+
+def is_sqlite(file: Path) -> bool:
+    return file.suffix in SUFFIXES
+
+
+def encode(entry: Any) -> str:
+    return json.dumps(entry, default=Database._encode)
+
+
+def decode(data: str) -> Any:
+    return json.loads(data, object_hook=Database._decode)
+
+
+class SQLiteTable(MutableMapping):
+    """Entries of one table by id, read from the database when first used.
+
+    Entries keep their identity once loaded, like the entries of warehub's
+    in-memory tables, so that changes made to them are written back on
+    commit.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, name: str):
+        self.connection: sqlite3.Connection = connection
+        self.name: str = name
+        self.columns: dict[str, Callable[[Any], Any]] = COLUMNS.get(name, {})
+        self.entries: dict[str, Any] = {}
+        self.stored: dict[str, str] = {}
+        self.complete: bool = False
+
+        if name not in COLUMNS:
+            connection.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (id INTEGER PRIMARY KEY, data TEXT NOT NULL)')
+
+    def load(self, rows: list[tuple[int, str]]) -> list[tuple[str, Any]]:
+        loaded = []
+        for id, data in rows:
+            if (key := str(id)) not in self.entries:
+                self.entries[key] = decode(data)
+                self.stored[key] = data
+            loaded.append((key, self.entries[key]))
+        return loaded
+
+    def find(self, where: str, parameters: tuple = ()) -> list[tuple[str, Any]]:
+        rows = self.connection.execute(f'SELECT id, data FROM "{self.name}" WHERE {where} ORDER BY id', parameters)
+        return self.load(rows.fetchall())
+
+    def select(self, where: str, parameters: tuple = ()) -> list[Any]:
+        return [entry for _, entry in self.find(where, parameters)]
+
+    def lookup(self, equals: dict[str, Any]) -> Optional[list[tuple[str, Any]]]:
+        """The entries whose indexed columns hold the values of ``equals``.
+
+        Entries put since the last commit are not in the database yet, so
+        they are always included.
+        :return:
+            The entries by id, or ``None`` if none of the fields is indexed.
+        """
+
+        conditions = []
+        parameters = []
+        for name, value in equals.items():
+            if (lookup := LOOKUPS.get(self.name, {}).get(name)) is not None and isinstance(value, (str, int)):
+                column, convert = lookup
+                conditions.append(f'{column} = ?')
+                parameters.append(convert(value))
+        if len(conditions) == 0:
+            return None
+        found = dict(self.find(' AND '.join(conditions), tuple(parameters)))
+        found.update((key, entry) for key, entry in self.entries.items() if key not in self.stored)
+        return sorted(found.items(), key=lambda item: int(item[0]))
+
+    def load_all(self) -> None:
+        if not self.complete:
+            self.select('1')
+            self.entries = dict(sorted(self.entries.items(), key=lambda item: int(item[0])))
+            self.complete = True
+
+    def next_id(self) -> int:
+        (stored,) = self.connection.execute(f'SELECT COALESCE(MAX(id), -1) FROM "{self.name}"').fetchone()
+        return max([stored, *map(int, self.entries)]) + 1
+
+    def flush(self) -> None:
+        names = ['id', *self.columns, 'data']
+        statement = (
+            f'INSERT OR REPLACE INTO "{self.name}" ({", ".join(names)}) '
+            f'VALUES ({", ".join("?" * len(names))})'
+        )
+        for key, entry in self.entries.items():
+            if self.stored.get(key) != (data := encode(entry)):
+                self.connection.execute(statement, (int(key), *(c(entry) for c in self.columns.values()), data))
+                self.stored[key] = data
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.entries and len(self.select('id = ?', (int(key),))) == 0:
+            raise KeyError(key)
+        return self.entries[key]
+
+    def __setitem__(self, key: str, entry: Any) -> None:
+        self.entries[key] = entry
+
+    def __delitem__(self, key: str) -> None:
+        self[key]
+        del self.entries[key]
+        self.stored.pop(key, None)
+        self.connection.execute(f'DELETE FROM "{self.name}" WHERE id = ?', (int(key),))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.entries or len(self.select('id = ?', (int(str(key)),))) > 0
+
+    def __iter__(self) -> Iterator[str]:
+        self.load_all()
+        return iter(list(self.entries))
+
+    def __len__(self) -> int:
+        self.load_all()
+        return len(self.entries)
+
+
+class SQLiteData(MutableMapping):
+    """Stand-in for the dictionary warehub keeps its tables in.
+
+    Like that dictionary, a table only exists once something was put in it,
+    and tables keep the order they were created in.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection: sqlite3.Connection = connection
+        self.tables: dict[str, SQLiteTable] = {
+            name: SQLiteTable(connection, name) for name in json.loads(self.meta('tables') or '[]')
+        }
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'last_commit':
+            if (value := self.meta(key)) is None:
+                raise KeyError(key)
+            return datetime.fromisoformat(value)
+        return self.tables[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == 'last_commit':
+            self.set_meta(key, value.isoformat())
+            return
+        if key not in self.tables:
+            self.tables[key] = SQLiteTable(self.connection, key)
+            self.set_meta('tables', json.dumps(list(self.tables)))
+        for id, entry in dict(value).items():
+            self.tables[key][id] = entry
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError('Tables can not be deleted')
+
+    def __iter__(self) -> Iterator[str]:
+        keys = list(self.tables)
+        if self.meta('last_commit') is not None:
+            keys.insert(0, 'last_commit')
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+
+def _rollback(cls: Type[Database]) -> None:
+    cls._data.connection.rollback()
+    cls._data = SQLiteData(cls._data.connection)
+
+
+def _commit(cls: Type[Database]) -> bool:
+    try:
+        for table in cls._data.tables.values():
+            table.flush()
+        cls._data['last_commit'] = datetime.now()
+        cls._data.connection.commit()
+        return True
+    except sqlite3.Error as e:
+        cls._data.connection.rollback()
+        print(f'SQLite error: {e}')
+    return False
+
+
+def _put(cls: Type[Database], table: Type[TableType], *entries: TableType) -> None:
+    table_name = table.__name__.lower()
+
+    if table_name not in cls._data:
+        cls._data[table_name] = {}
+
+    table_data = cls._data[table_name]
+
+    for entry in entries:
+        if entry.id < 0:
+            entry._id = table_data.next_id()
+        table_data[str(entry.id)] = entry
+
+
+def _get(cls: Type[Database], table: Type[TableType], where: ComparisonType = None) -> list[tuple[str, TableType]]:
+    if (table_name := table.__name__.lower()) not in cls._data:
+        return []
+    table_data = cls._data[table_name]
+
+    if (entries := table_data.lookup(getattr(where, 'equals', {}))) is None:
+        table_data.load_all()
+        entries = list(table_data.entries.items())
+
+    if where is None or (isinstance(where, bool) and where):
+        return entries
+    return [(id, entry) for id, entry in entries if where.compare(entry)]
+
+
+def _equals(self: TableField, other: Any) -> Comparison:
+    comparison = _field_eq(self, other)
+    # Kept so that the query can be looked up by an index
+    comparison.equals = {self.name: other}
+    return comparison
+
+
+def _and(self: Comparison, other: Comparison) -> Comparison:
+    comparison = _comparison_and(self, other)
+    comparison.equals = {**getattr(self, 'equals', {}), **getattr(other, 'equals', {})}
+    return comparison
+
+
+def connect(file: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(file)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def configure() -> bool:
+    """Back warehub's database with SQLite if the configured file is one.
+
+    warehub keeps every table in one dictionary and rewrites the whole file
+    on every commit. The dictionary is replaced with tables read from SQLite
+    on demand, and a commit only writes the entries that changed.
+
+    warehub looks projects, releases and files up with predicates over the
+    whole table. The ones that compare indexed fields for equality, like the
+    lookups of ``add_package``, only read the matching rows. Like any other
+    value, an equal value is then no longer also searched for as a pattern,
+    so a project named ``foo`` does not find ``foobar`` too.
+    """
+
+    if not is_sqlite(file := Database.file()):
+        return False
+
+    Database._data = SQLiteData(connect(file))
+    Database.rollback = classmethod(_rollback)
+    Database.commit = classmethod(_commit)
+    Database.put = classmethod(_put)
+    Database._get = classmethod(_get)
+    TableField.__eq__ = _equals
+    Comparison.__and__ = _and
+    return True
+
+
+def select_in(table: Type[TableType], column: str, values: list[Any]) -> Optional[list[TableType]]:
+    """Look entries up by an indexed column, if the database is backed by SQLite."""
+
+    if not isinstance(Database._data, SQLiteData):
+        return None
+    if (name := table.__name__.lower()) not in Database._data:
+        return []
+    entries = []
+    for i in range(0, len(values), 500):
+        chunk = values[i:i + 500]
+        entries.extend(Database._data[name].select(f'{column} IN ({", ".join("?" * len(chunk))})', tuple(chunk)))
+    return entries
+
+
+def import_json(json_file: Path, sqlite_file: Path) -> None:
+    # The journal next to it holds the changes not yet folded back into it,
+    # and may be all there is of a new site
+    journal = journal_database.Journal(json_file)
+    if not json_file.exists() and not journal.file.exists():
+        raise FileNotFoundError(f'No database or journal found for: {json_file}')
+    data = journal.load()
+
+    connection = connect(sqlite_file)
+    tables = SQLiteData(connection)
+    for key, value in data.items():
+        tables[key] = value
+    for table in tables.tables.values():
+        table.flush()
+    connection.commit()
+    connection.close()
+
+
+def export_json(sqlite_file: Path, json_file: Path) -> None:
+    connection = connect(sqlite_file)
+    tables = SQLiteData(connection)
+
+    data: dict[str, Any] = {}
+    for key in tables:
+        if isinstance(value := tables[key], SQLiteTable):
+            value.load_all()
+            value = value.entries
+        data[key] = value
+    connection.close()
+
+    # Same layout as warehub writes
+    json_file.write_text(json.dumps(data, indent=2, default=Database._encode))
+    # It would be replayed over the exported entries
+    journal_database.Journal(json_file).file.unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the package database between JSON and SQLite.')
+    parser.add_argument('command', choices=['import', 'export'], help='import JSON into SQLite, or export SQLite to JSON')
+    parser.add_argument('source', type=Path)
+    parser.add_argument('target', type=Path)
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        import_json(args.source, args.target)
+    else:
+        export_json(args.source, args.target)
+
+
+if __name__ == '__main__':
+    main()
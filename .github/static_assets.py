@@ -0,0 +1,190 @@
+import contextlib
+import hashlib
+import logging
+import mimetypes
+import re
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Optional
+
+import requests
+import warehub
+from warehub.config import Config
+from warehub.model import Template
+
+import homepage
+import search_index
+from site_writer import SiteWriter
+
+logger = logging.getLogger(warehub.__title__)
+
+# Bundled with these scripts
+SOURCE = Path(__file__).parent / 'assets'
+
+# Written to static/, with the digest of their content in their name so that
+# browsers can cache them for good
+DIRECTORY = 'static'
+
+FONT_FAMILY = '"Montserrat", "HelveticaNeue", "Helvetica Neue", Helvetica, Arial, sans-serif'
+
+# Where the pages load the font from when it is not bundled
+GOOGLE_FONTS = 'google'
+SYSTEM_FONTS = 'system'
+FONT_SOURCES = (GOOGLE_FONTS, SYSTEM_FONTS)
+
+# Seconds before an image that could not be downloaded is tried again
+RETRY_AFTER = 24 * 60 * 60
+FAILED = '.failed'
+
+
+@dataclass
+class Assets:
+    """The files every page shares, by their path relative to the site."""
+
+    files: dict[PurePosixPath, bytes] = field(default_factory=dict)
+    # Whether the pages link Google Fonts, as the fonts are neither served
+    # with the site nor left to the system
+    google_fonts: bool = True
+    stylesheet_url: str = ''
+    script_url: str = ''
+    image_url: str = ''
+
+    def add(self, name: str, data: bytes) -> str:
+        """Add a file under its fingerprinted name.
+
+        :return:
+            The url of the file.
+        """
+
+        stem, suffix = name.rsplit('.', 1)
+        path = PurePosixPath(DIRECTORY) / f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}.{suffix}'
+        self.files[path] = data
+        return f'{Config.url}{path}'
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(''.join(sorted(p.name for p in self.files)).encode()).hexdigest()
+
+
+def font_faces(fonts: dict[str, str]) -> str:
+    """``@font-face`` rules for the fonts bundled as ``<Family>-<weight>.woff2``."""
+
+    rules = ''
+    for name, url in sorted(fonts.items()):
+        family, weight = Path(name).stem.rsplit('-', 1)
+        rules += (
+            f'\n@font-face {{\n    font-family: "{family}";\n    font-weight: {weight};\n    font-display: swap;\n'
+            f'    src: local("{family}"), url("{url}") format("woff2");\n}}\n'
+        )
+    return rules
+
+
+def stylesheet(fonts: dict[str, str]) -> str:
+    parts = [
+        (SOURCE / 'skeleton.css').read_text(),
+        font_faces(fonts),
+        Template.STYLE,
+        # Falls back to the system fonts when Montserrat is neither bundled
+        # nor installed
+        f'\nbody {{\n    font-family: {FONT_FAMILY};\n}}\n',
+        homepage.STYLE,
+    ]
+    return '\n'.join(p.strip('\n') + '\n' for p in parts if p.strip())
+
+
+def fetch_image(url: str, cache: Path) -> Optional[tuple[str, bytes]]:
+    """Download the image of the site, once, to serve it with the site.
+
+    A failed download is only tried again after ``RETRY_AFTER`` seconds, so
+    that sites generated without access to the image do not wait for it
+    every time.
+    """
+
+    directory = cache / hashlib.sha256(url.encode()).hexdigest()[:16]
+    failed = directory / FAILED
+    if directory.exists():
+        for cached in directory.iterdir():
+            if cached.name != FAILED:
+                return cached.name, cached.read_bytes()
+        if failed.exists() and time.time() - failed.stat().st_mtime < RETRY_AFTER:
+            logger.info(f'The image could not be downloaded in the last day, it stays at {url}')
+            return None
+
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning(f'Could not download the image, it stays at {url}: {e}')
+        failed.touch()
+        return None
+
+    name = PurePosixPath(urllib.parse.urlparse(url).path).name or 'image'
+    if '.' not in name:
+        extension = mimetypes.guess_extension(response.headers.get('Content-Type', '').split(';')[0]) or '.bin'
+        name += extension
+    (directory / name).write_bytes(response.content)
+    failed.unlink(missing_ok=True)
+    return name, response.content
+
+
+def build(fonts: str = GOOGLE_FONTS) -> Assets:
+    """The shared files of the pages, with the font loaded from ``fonts`` unless it is bundled."""
+
+    assets = Assets()
+
+    bundled = {}
+    if (fonts_directory := SOURCE / 'fonts').exists():
+        for font in sorted(fonts_directory.glob('*.woff2')):
+            bundled[font.name] = assets.add(font.name, font.read_bytes())
+    assets.google_fonts = len(bundled) == 0 and fonts == GOOGLE_FONTS
+
+    assets.stylesheet_url = assets.add('site.css', stylesheet(bundled).encode())
+    assets.script_url = assets.add('search.js', search_index.SCRIPT.encode())
+
+    assets.image_url = Config.image_url
+    if Config.image_url and not Config.image_url.startswith(Config.url):
+        if (image := fetch_image(Config.image_url, Config.path / '.cache' / 'image')) is not None:
+            assets.image_url = assets.add(*image)
+    return assets
+
+
+def self_hosted(template: str, stylesheet_url: str, google_fonts: bool) -> str:
+    """Link a page template to the shared stylesheet, instead of the CDN and its own style.
+
+    The link to Google Fonts is only kept with ``google_fonts``.
+    """
+
+    template = re.sub(r'\n *<!-- Skeleton CSS -->\n *<link [^>]*skeleton[^>]*>', '', template)
+    if not google_fonts:
+        template = re.sub(r'\n *<!-- Font -->\n *<link [^>]*fonts\.googleapis\.com[^>]*>', '', template)
+    return re.sub(r'<style>%%STYLE%%\s*</style>', f'<link href="{stylesheet_url}" rel="stylesheet"/>', template)
+
+
+@contextlib.contextmanager
+def serving(assets: Assets) -> Iterator[None]:
+    """Temporarily render the pages of warehub with the assets of the site."""
+
+    templates = {name: getattr(Template, name) for name in ('HOMEPAGE', 'RELEASE', 'SIMPLE')}
+    image_url = Config.image_url
+    for name, template in templates.items():
+        setattr(Template, name, self_hosted(template, assets.stylesheet_url, assets.google_fonts))
+    Config.image_url = assets.image_url
+    try:
+        yield
+    finally:
+        for name, template in templates.items():
+            setattr(Template, name, template)
+        Config.image_url = image_url
+
+
+def write(writer: SiteWriter, assets: Assets) -> None:
+    for path, data in assets.files.items():
+        writer.write(Config.path / path, data)
+    # Assets of earlier versions of the pages
+    if (directory := Config.path / DIRECTORY).exists():
+        for file in directory.iterdir():
+            if PurePosixPath(DIRECTORY) / file.name not in assets.files and not file.name.endswith(('.gz', '.br')):
+                writer.delete(file)
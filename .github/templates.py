@@ -0,0 +1,59 @@
+import functools
+import io
+import re
+from typing import Mapping, TextIO
+
+MARKER = re.compile(r'%%([A-Z_]+)%%')
+
+
+class CompiledTemplate:
+    """A page template, split once at its ``%%NAME%%`` markers.
+
+    Rendering writes the literal parts and the values in turn, instead of
+    searching the whole page again for every marker. Markers without a value
+    are kept as they are, like ``str.replace`` leaves them.
+    """
+
+    def __init__(self, source: str):
+        parts = MARKER.split(source)
+        self.literals: list[str] = parts[0::2]
+        self.names: list[str] = parts[1::2]
+
+    def bind(self, values: Mapping[str, str]) -> 'CompiledTemplate':
+        """The template with some of its markers already filled in, like the ones of the site."""
+
+        bound = CompiledTemplate('')
+        bound.literals = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            if name in values:
+                bound.literals[-1] += values[name] + literal
+            else:
+                bound.names.append(name)
+                bound.literals.append(literal)
+        return bound
+
+    def render_into(self, out: TextIO, values: Mapping[str, str]) -> None:
+        write = out.write
+        write(self.literals[0])
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = values.get(name)
+            write(f'%%{name}%%' if value is None else value)
+            write(literal)
+
+    def render(self, values: Mapping[str, str]) -> str:
+        out = io.StringIO()
+        self.render_into(out, values)
+        return out.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile a template once per process, keyed by its text."""
+
+    return CompiledTemplate(source)
+
+
+def style(css: str) -> str:
+    """A stylesheet indented like the ``%%STYLE%%`` of the warehub templates."""
+
+    return ''.join('\n        ' + s for s in css.splitlines())
@@ -0,0 +1,102 @@
+import io
+import re
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+# Enough for the central directory and, as dist-info is written last, usually
+# the METADATA member itself in a single request
+TAIL_SIZE = 64 * 1024
+
+
+class RangeFile(io.RawIOBase):
+    """Read-only file over a remote file, fetched with HTTP range requests.
+
+    The tail of the file is fetched up front, any other part only when it is
+    read.
+    """
+
+    def __init__(self, session: requests.Session, url: str, size: int, tail: bytes):
+        super().__init__()
+        self.session: requests.Session = session
+        self.url: str = url
+        self.size: int = size
+        self.tail: bytes = tail
+        self.tail_start: int = size - len(tail)
+        self.position: int = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        end = min(self.position + len(buffer), self.size)
+        if self.position >= end:
+            return 0
+        if self.position >= self.tail_start:
+            data = self.tail[self.position - self.tail_start:end - self.tail_start]
+        else:
+            data = fetch_range(self.session, self.url, f'bytes={self.position}-{end - 1}')
+            if data is None:
+                raise OSError(f'Range request not honoured by {self.url}')
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def fetch_range(session: requests.Session, url: str, byte_range: str) -> Optional[bytes]:
+    headers = {'Accept': 'application/octet-stream', 'Range': byte_range}
+    with session.get(url, headers=headers, stream=True) as response:
+        if response.status_code != requests.codes.partial_content:
+            # Anything else, including a 200 with the whole file, means the
+            # server does not support ranges. Don't read the body.
+            return None
+        return response.content
+
+
+def metadata_member(archive: zipfile.ZipFile) -> bytes:
+    for name in archive.namelist():
+        if re.fullmatch(r'[^/]+\.dist-info/METADATA', name) is not None:
+            return archive.read(name)
+    raise zipfile.BadZipFile('Wheel does not contain a .dist-info/METADATA file')
+
+
+def fetch_metadata(session: requests.Session, url: str, size: int) -> Optional[bytes]:
+    """Read the METADATA of a remote wheel without downloading all of it.
+
+    :return:
+        The METADATA file, or ``None`` if the server does not support range
+        requests and the wheel has to be downloaded instead.
+    """
+
+    if (tail := fetch_range(session, url, f'bytes=-{min(TAIL_SIZE, size)}')) is None:
+        return None
+    raw = RangeFile(session, url, size, tail)
+    with zipfile.ZipFile(io.BufferedReader(raw, buffer_size=TAIL_SIZE)) as archive:
+        return metadata_member(archive)
+
+
+def read_metadata(file: Path) -> bytes:
+    with zipfile.ZipFile(file) as archive:
+        return metadata_member(archive)
+
+
+def sidecar(file: Path) -> Path:
+    """The PEP 658 core metadata file served next to a distribution."""
+
+    return file.with_name(f'{file.name}.metadata')
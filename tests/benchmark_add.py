@@ -0,0 +1,154 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from pathlib import Path
+
+import add_packages
+import fake_github
+from fake_github import Repository
+
+
+def stats(domain: str) -> dict[str, int]:
+    with urllib.request.urlopen(f'{domain}_stats') as response:
+        return json.loads(response.read())
+
+
+def new_site(site: Path) -> None:
+    site.mkdir()
+    (site / 'config.json').write_text(json.dumps({'path': '.', 'database': 'data.json', 'url': 'https://user.github.io/repo'}))
+
+
+def peak_rss() -> int:
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_phase(results: multiprocessing.Queue, *args) -> None:
+    # The log of every file would be measured as well
+    logging.disable(logging.INFO)
+    results.put(run(*args))
+
+
+def measure(*args) -> dict:
+    """Run a phase in a new process, so that the peak RSS is the one of the phase alone.
+
+    The peak of a process is never reset, so phases run in the same process
+    would all report the peak of the first one.
+    """
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_phase, args=(results, *args))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f'Phase {args[0]} failed with exit code {process.exitcode}')
+    return results.get()
+
+
+def run(phase: str, domain: str, site: Path, args: argparse.Namespace, repositories: list[str]) -> dict:
+    before = stats(domain)
+    files_before = sum(f.stat().st_size for f in (site / 'files').glob('*.whl'))
+    count_before = len(list((site / 'files').glob('*.whl')))
+
+    add_args = ['--domain', domain, '--cache-dir', str(site.parent / 'downloads'), '--jobs', str(args.jobs)]
+    add_args += ['--downloads', str(args.downloads)]
+    if not args.generate:
+        add_args.append('--no-generate')
+
+    os.chdir(site)
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    add_packages.add(add_args + repositories)
+    seconds = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    tracemalloc.stop()
+
+    after = stats(domain)
+    added = sum(f.stat().st_size for f in (site / 'files').glob('*.whl')) - files_before
+    count = len(list((site / 'files').glob('*.whl'))) - count_before
+    return {
+        'phase': phase,
+        'seconds': seconds,
+        'files': count,
+        'bytes': added,
+        'api': after['api'] - before['api'],
+        'not_modified': after['not_modified'] - before['not_modified'],
+        'assets': after['assets'] - before['assets'],
+        'peak_rss': peak_rss(),
+        'traced': traced,
+    }
+
+
+def report(result: dict) -> str:
+    seconds = result['seconds']
+    line = (
+        f'{result["phase"]:<8} {seconds:8.2f} s {result["files"]:7d} files {result["files"] / seconds:8.1f} files/s'
+        f' {result["bytes"] / seconds / 1024 / 1024:8.2f} MiB/s'
+        f' {result["api"]:6d} API calls ({result["not_modified"]} not modified)'
+        f' {result["assets"]:6d} asset requests'
+        f' {result["peak_rss"] / 1024 / 1024:8.1f} MiB peak RSS'
+    )
+    if result['traced'] is not None:
+        line += f' {result["traced"] / 1024 / 1024:8.1f} MiB traced'
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure add against a local fake GitHub')
+    parser.add_argument('--repositories', type=int, default=4)
+    parser.add_argument('--releases', type=int, default=25, help='Releases in every repository')
+    parser.add_argument('--assets', type=int, default=4, help='Assets in every release')
+    parser.add_argument('--size', type=int, default=100_000, help='Bytes added to every wheel')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds the server waits before every response')
+    parser.add_argument('--jobs', type=int, default=4)
+    parser.add_argument('--downloads', type=int, default=8)
+    parser.add_argument('--generate', action='store_true', help='Also generate the site after adding')
+    parser.add_argument('--tracemalloc', action='store_true', help='Also trace the peak of Python allocations')
+    args = parser.parse_args()
+
+    repositories = [f'Bench/repo-{i}' for i in range(args.repositories)]
+    served = [Repository(r, args.releases, args.assets, args.size) for r in repositories]
+
+    # The server runs in its own process, so it does not count towards the
+    # time and the memory of add
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=fake_github.serve, args=(served, args.latency, ready), daemon=True)
+    server.start()
+    domain, _ = ready.get()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp:
+        site = Path(temp) / 'site'
+        new_site(site)
+
+        # Nothing known yet, every file is downloaded
+        results.append(measure('cold', domain, site, args, repositories))
+        # Every listing is answered with 304 Not Modified
+        results.append(measure('warm', domain, site, args, repositories))
+
+        # A new site, with every file in the download cache
+        shutil.rmtree(site)
+        new_site(site)
+        results.append(measure('cached', domain, site, args, repositories))
+
+    server.terminate()
+
+    total = args.repositories * args.releases * args.assets
+    print(f'{args.repositories} repositories x {args.releases} releases x {args.assets} assets = {total} files'
+          f' of about {args.size} bytes, {args.latency * 1000:.0f} ms latency')
+    for result in results:
+        print(report(result))
+
+
+if __name__ == '__main__':
+    main()
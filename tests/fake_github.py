@@ -0,0 +1,427 @@
+import argparse
+import contextlib
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import zipfile
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+# Zip entries get a fixed time, so the same asset is always the same bytes
+DATE_TIME = (2022, 1, 21, 19, 2, 8)
+
+
+@dataclass
+class Repository:
+    """A synthetic repository with ``releases`` releases of ``assets`` wheels each."""
+
+    name: str
+    releases: int = 1
+    assets: int = 1
+    # Bytes added to every wheel, on top of the few hundred of its metadata
+    size: int = 0
+    updated_at: str = '2022-01-21T19:02:09Z'
+    # Changed to give every asset different bytes, like a re-uploaded release
+    revision: int = 0
+    requires_python: Optional[str] = '>=3.8'
+    # Every wheel is followed by its signature
+    signed: bool = False
+
+    @property
+    def files(self) -> int:
+        """The number of assets of every release, signatures included."""
+
+        return self.assets * 2 if self.signed else self.assets
+
+    @property
+    def package(self) -> str:
+        return self.name.split('/')[1].replace('-', '_').lower()
+
+    def version(self, release: int, asset: int) -> str:
+        # All the same length, as warehub looks releases up by a regular
+        # expression search of the version, and 1.0 would also find 11.0
+        return f'1{release:05d}.1{asset:03d}'
+
+    def filename(self, release: int, asset: int) -> str:
+        return f'{self.package}-{self.version(release, asset)}-py3-none-any.whl'
+
+    def asset_name(self, release: int, index: int) -> str:
+        """The name of the ``index``-th asset of a release, out of ``files``."""
+
+        if not self.signed:
+            return self.filename(release, index)
+        asset, is_signature = divmod(index, 2)
+        return self.filename(release, asset) + ('.asc' if is_signature else '')
+
+
+def wheel(name: str, version: str, size: int = 0, revision: int = 0, requires_python: Optional[str] = '>=3.8') -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as file:
+        def write(path: str, data: Union[str, bytes]):
+            file.writestr(zipfile.ZipInfo(path, DATE_TIME), data)
+
+        write(f'{name}/__init__.py', f'REVISION = {revision}\n')
+        if size > 0:
+            write(f'{name}/data.bin', bytes(size))
+        headers = [
+            f'Metadata-Version: 2.1',
+            f'Name: {name}',
+            f'Version: {version}',
+            f'Summary: A sample package',
+        ]
+        if requires_python is not None:
+            headers.append(f'Requires-Python: {requires_python}')
+        headers += [f'Description-Content-Type: text/plain', f'']
+        write(f'{name}-{version}.dist-info/METADATA', '\n'.join(headers))
+        write(
+            f'{name}-{version}.dist-info/WHEEL',
+            'Wheel-Version: 1.0\nGenerator: fake_github\nRoot-Is-Purelib: true\nTag: py3-none-any\n',
+        )
+        write(f'{name}-{version}.dist-info/RECORD', '')
+    return buffer.getvalue()
+
+
+def signature(name: str, revision: int = 0) -> bytes:
+    # Not checked by add, only its size and name matter
+    digest = hashlib.sha256(f'{name} {revision}'.encode()).hexdigest()
+    return f'-----BEGIN PGP SIGNATURE-----\n\n{digest}\n-----END PGP SIGNATURE-----\n'.encode()
+
+
+class FakeGitHub:
+    """A local stand-in for the releases API of GitHub and its asset host.
+
+    The API host lists the releases of the repositories in pages, with ETags
+    and Link headers. It redirects downloads of assets to a second host, the
+    way api.github.com redirects to objects.githubusercontent.com. The asset
+    host supports range requests. Every request waits ``latency`` seconds
+    before it is answered.
+
+    Requests are recorded as ``(host, path, status)``, with ``host`` being
+    ``'api'`` or ``'assets'``, together with the most requests each host was
+    answering at the same time. ``GET /_stats`` on the API host returns the
+    counts, for servers running in another process.
+
+    Like the storage GitHub redirects to, the asset host rejects requests
+    that carry credentials.
+    """
+
+    def __init__(self, repositories: list[Repository], latency: float = 0.0):
+        self.repositories: dict[str, Repository] = {r.name: r for r in repositories}
+        self.latency: float = latency
+        self.requests: list[tuple[str, str, int]] = []
+        self.active: dict[str, int] = {'api': 0, 'assets': 0}
+        self.peak: dict[str, int] = {'api': 0, 'assets': 0}
+        self.lock: threading.Lock = threading.Lock()
+
+        self.api = ThreadingHTTPServer(('127.0.0.1', 0), type('Handler', (ApiHandler,), {'github': self}))
+        self.assets = ThreadingHTTPServer(('127.0.0.1', 0), type('Handler', (AssetHandler,), {'github': self}))
+
+    @property
+    def domain(self) -> str:
+        return f'http://127.0.0.1:{self.api.server_port}/'
+
+    @property
+    def asset_host(self) -> str:
+        return f'http://127.0.0.1:{self.assets.server_port}/'
+
+    def start(self) -> 'FakeGitHub':
+        for server in (self.api, self.assets):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        for server in (self.api, self.assets):
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self) -> 'FakeGitHub':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def record(self, host: str, path: str, status: int) -> None:
+        with self.lock:
+            self.requests.append((host, path, status))
+
+    @contextlib.contextmanager
+    def serving(self, host: str):
+        with self.lock:
+            self.active[host] += 1
+            self.peak[host] = max(self.peak[host], self.active[host])
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active[host] -= 1
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            requests = list(self.requests)
+            peak = dict(self.peak)
+        return {
+            'api': sum(1 for h, _, _ in requests if h == 'api'),
+            'not_modified': sum(1 for h, _, s in requests if h == 'api' and s == 304),
+            'redirects': sum(1 for h, _, s in requests if h == 'api' and s == 302),
+            'assets': sum(1 for h, _, _ in requests if h == 'assets'),
+            'peak_api': peak['api'],
+            'peak_assets': peak['assets'],
+        }
+
+    def asset_id(self, repository: Repository, release: int, asset: int) -> int:
+        # Numbered after the assets of the repositories before it, the way
+        # find_asset looks them up
+        offset = 0
+        for other in self.repositories.values():
+            if other.name == repository.name:
+                break
+            offset += other.releases * other.files
+        return offset + release * repository.files + asset + 1
+
+    def find_asset(self, id: int) -> Optional[tuple[Repository, int, int]]:
+        id -= 1
+        for repository in self.repositories.values():
+            count = repository.releases * repository.files
+            if id < count:
+                return repository, id // repository.files, id % repository.files
+            id -= count
+        return None
+
+    def asset_data(self, repository: Repository, release: int, asset: int) -> bytes:
+        if repository.signed:
+            asset, is_signature = divmod(asset, 2)
+            if is_signature:
+                return signature(repository.filename(release, asset), repository.revision)
+        return cached_wheel(
+            repository.package,
+            repository.version(release, asset),
+            repository.size,
+            repository.revision,
+            repository.requires_python,
+        )
+
+    def asset_size(self, repository: Repository, release: int, asset: int) -> int:
+        if repository.signed:
+            asset, is_signature = divmod(asset, 2)
+            if is_signature:
+                return len(signature(repository.filename(release, asset), repository.revision))
+        return wheel_size(
+            repository.package,
+            repository.version(release, asset),
+            repository.size,
+            repository.revision,
+            repository.requires_python,
+        )
+
+    def release_json(self, repository: Repository, release: int) -> dict:
+        owner_repo = repository.name
+        return {
+            'id': release + 1,
+            'tag_name': f'v{release}',
+            'assets': [
+                {
+                    'id': (id := self.asset_id(repository, release, asset)),
+                    'name': repository.asset_name(release, asset),
+                    'url': f'{self.domain}repos/{owner_repo}/releases/assets/{id}',
+                    'size': self.asset_size(repository, release, asset),
+                    'updated_at': repository.updated_at,
+                }
+                for asset in range(repository.files)
+            ],
+        }
+
+
+@functools.lru_cache(maxsize=32)
+def cached_wheel(name: str, version: str, size: int, revision: int, requires_python: Optional[str]) -> bytes:
+    return wheel(name, version, size, revision, requires_python)
+
+
+@functools.lru_cache(maxsize=None)
+def wheel_size(name: str, version: str, size: int, revision: int, requires_python: Optional[str]) -> int:
+    # A stored entry grows the archive by exactly its size, so listings do not
+    # need to build the large wheels
+    if size == 0:
+        return len(wheel(name, version, 0, revision, requires_python))
+    return len(wheel(name, version, 1, revision, requires_python)) - 1 + size
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keeps connections alive, like GitHub does
+    protocol_version = 'HTTP/1.1'
+
+    github: FakeGitHub
+    host: str
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code: int, body: bytes = b'', **headers: str):
+        self.github.record(self.host, self.path, code)
+        self.send_response(code)
+        for name, value in {'Content-Length': str(len(body)), **headers}.items():
+            self.send_header(name.replace('_', '-'), value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def not_found(self):
+        return self.reply(404, b'{"message": "Not Found"}', Content_Type='application/json')
+
+    def do_GET(self):
+        with self.github.serving(self.host):
+            self.get()
+
+    def get(self):
+        raise NotImplementedError
+
+
+class ApiHandler(Handler):
+    host = 'api'
+
+    def get(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/_stats':
+            body = json.dumps(self.github.stats()).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        time.sleep(self.github.latency)
+        parts = url.path.strip('/').split('/')
+        if len(parts) < 4 or parts[0] != 'repos' or parts[3] != 'releases':
+            return self.not_found()
+        if (repository := self.github.repositories.get(f'{parts[1]}/{parts[2]}')) is None:
+            return self.not_found()
+
+        if len(parts) == 4:
+            return self.list_releases(repository, urllib.parse.parse_qs(url.query))
+        if len(parts) == 6 and parts[4] == 'assets' and parts[5].isdigit():
+            return self.asset(int(parts[5]))
+        return self.not_found()
+
+    def list_releases(self, repository: Repository, query: dict[str, list[str]]):
+        per_page = min(int(query.get('per_page', ['30'])[0]), 100)
+        page = int(query.get('page', ['1'])[0])
+        last = max((repository.releases + per_page - 1) // per_page, 1)
+
+        # Newest first, like GitHub
+        newest = repository.releases - 1 - (page - 1) * per_page
+        releases = [self.github.release_json(repository, r) for r in range(newest, max(newest - per_page, -1), -1)]
+        body = json.dumps(releases).encode()
+
+        etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, ETag=etag)
+
+        base = f'{self.github.domain}repos/{repository.name}/releases?per_page={per_page}'
+        links = []
+        if page < last:
+            links.append(f'<{base}&page={page + 1}>; rel="next"')
+            links.append(f'<{base}&page={last}>; rel="last"')
+        headers = {'ETag': etag, 'Content_Type': 'application/json'}
+        if links:
+            headers['Link'] = ', '.join(links)
+        return self.reply(200, body, **headers)
+
+    def asset(self, id: int):
+        if (found := self.github.find_asset(id)) is None:
+            return self.not_found()
+        repository, release, asset = found
+        if self.headers.get('Accept') != 'application/octet-stream':
+            return self.reply(200, json.dumps(self.github.release_json(repository, release)['assets'][asset]).encode())
+        location = f'{self.github.asset_host}{repository.name}/{id}/{repository.asset_name(release, asset)}'
+        return self.reply(302, Location=location)
+
+
+class AssetHandler(Handler):
+    host = 'assets'
+
+    def get(self):
+        time.sleep(self.github.latency)
+        if 'Authorization' in self.headers:
+            return self.reply(400, b'Only one auth mechanism allowed', Content_Type='text/plain')
+        parts = urllib.parse.urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) != 4 or not parts[2].isdigit() or (found := self.github.find_asset(int(parts[2]))) is None:
+            return self.not_found()
+        data = self.github.asset_data(*found)
+
+        if (byte_range := self.headers.get('Range')) is None:
+            return self.reply(200, data, Content_Type='application/octet-stream')
+        start, _, end = byte_range.removeprefix('bytes=').partition('-')
+        if start == '':
+            start, end = max(len(data) - int(end), 0), len(data) - 1
+        else:
+            start, end = int(start), min(int(end or len(data) - 1), len(data) - 1)
+        return self.reply(
+            206,
+            data[start:end + 1],
+            Content_Type='application/octet-stream',
+            Content_Range=f'bytes {start}-{end}/{len(data)}',
+        )
+
+
+@dataclass
+class Site:
+    """A site in a temporary directory, which is the working directory while it is open."""
+
+    github: FakeGitHub
+    path: Path
+
+    def add(self, *args: str) -> None:
+        """Run add against the fake GitHub, with a download cache inside the site."""
+
+        # Imported here, so that the server runs without the site code
+        import add_packages
+
+        add_packages.add(['--domain', self.github.domain, '--cache-dir', 'downloads', *args])
+
+
+@contextlib.contextmanager
+def site(repositories: list[Repository], database: str = 'data.json', latency: float = 0.0) -> Iterator[Site]:
+    """Serve ``repositories`` and open a new site that packages are added to from them."""
+
+    cwd = os.getcwd()
+    with FakeGitHub(repositories, latency) as github, tempfile.TemporaryDirectory() as temp:
+        os.chdir(temp)
+        try:
+            with open('config.json', 'w') as file:
+                json.dump({'path': '.', 'database': database, 'url': 'https://user.github.io/repo'}, file)
+            yield Site(github, Path(temp))
+        finally:
+            os.chdir(cwd)
+
+
+def serve(repositories: list[Repository], latency: float, ready) -> None:
+    """Serve until the process is stopped, putting the API and asset hosts in the ``ready`` queue."""
+
+    with FakeGitHub(repositories, latency) as github:
+        ready.put((github.domain, github.asset_host))
+        threading.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve synthetic repositories like the releases API of GitHub')
+    parser.add_argument('repositories', nargs='+', help='<user>/<repo_name>')
+    parser.add_argument('--releases', type=int, default=10)
+    parser.add_argument('--assets', type=int, default=2, help='Assets in every release')
+    parser.add_argument('--size', type=int, default=0, help='Bytes added to every wheel')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before every response')
+    args = parser.parse_args()
+
+    repositories = [Repository(r, args.releases, args.assets, args.size) for r in args.repositories]
+    with FakeGitHub(repositories, args.latency) as github:
+        print(f'Serving on {github.domain}, assets on {github.asset_host}', flush=True)
+        threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import fake_github
+from fake_github import Repository
+
+
+def add(limits: list[str]) -> dict[str, int]:
+    repository = Repository('Sample/sample', releases=1, assets=16)
+    with fake_github.site([repository], latency=0.3) as site:
+        site.add('--no-generate', '--token', 'secret', *limits, repository.name)
+        # The token never reaches the asset host, which would reject it
+        assert len(list(Path('files').glob('*.whl'))) == 16
+        return site.github.stats()
+
+
+def main():
+    # The cap per host applies to the host that serves the files, not only
+    # to the API that redirects to it
+    stats = add([])
+    assert stats['peak_assets'] == 4, stats
+    assert stats['peak_api'] <= 4, stats
+
+    # More downloads than the default executor has threads
+    stats = add(['--downloads', '16', '--downloads-per-host', '16'])
+    assert stats['peak_assets'] > 8, stats
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import fake_github
+from fake_github import Repository
+
+
+def main():
+    # Its wheels fail to load, as their Requires-Python is not a specifier
+    broken = Repository('Sample/broken', requires_python='three')
+    with fake_github.site([Repository('Sample/sample'), broken]) as site:
+        github = site.github
+
+        site.add('Sample/sample', 'Sample/broken')
+        assert ('assets', '/Sample/sample/1/sample-100000.1000-py3-none-any.whl', 200) in github.requests, github.requests
+
+        github.requests.clear()
+        site.add('Sample/sample', 'Sample/broken')
+        listings = sorted(r for r in github.requests if r[1].endswith('/releases?per_page=100'))
+        assert listings == [
+            # The listing of a file that was not added is fetched again
+            ('api', '/repos/Sample/broken/releases?per_page=100', 200),
+            ('api', '/repos/Sample/sample/releases?per_page=100', 304),
+        ], github.requests
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,8 @@
-import warehub.command
+import generate_site
 
 
 def main():
-    warehub.command.generate(['--verbose'])
+    generate_site.generate(['--verbose'])
 
 
 if __name__ == '__main__':
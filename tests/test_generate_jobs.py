@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import fake_github
+import generate_site
+from fake_github import Repository
+
+
+def tree(root: Path) -> dict[str, bytes]:
+    return {f.relative_to(root).as_posix(): f.read_bytes() for f in sorted(root.rglob('*')) if f.is_file()}
+
+
+def generate(site: Path, target: Path, args: list[str]) -> dict[str, bytes]:
+    shutil.copytree(site, target, ignore=shutil.ignore_patterns('downloads'))
+    os.chdir(target)
+    try:
+        generate_site.generate(args)
+    finally:
+        os.chdir(site)
+    return tree(target)
+
+
+def main():
+    repositories = [Repository(f'Sample/sample-{i}', releases=3, assets=2) for i in range(5)]
+    with fake_github.site(repositories) as site, tempfile.TemporaryDirectory() as temp:
+        site.add('--no-generate', *(r.name for r in repositories))
+        trees = Path(temp)
+
+        # The pages of projects rendered by the workers are the same bytes as
+        # the ones of a single process
+        for extra in ([], ['--precompress', '1']):
+            serial = generate(site.path, trees / 'serial', ['--full'] + extra)
+            parallel = generate(site.path, trees / 'parallel', ['--full', '--jobs', '3'] + extra)
+
+            assert any(n.startswith('simple/sample-4/') for n in serial), sorted(serial)
+            if extra:
+                assert any(n.endswith('.br') for n in serial) and any(n.endswith('.gz') for n in serial)
+            assert serial.keys() == parallel.keys(), sorted(serial.keys() ^ parallel.keys())
+            changed = sorted(n for n in serial if serial[n] != parallel[n])
+            assert not changed, changed
+
+            shutil.rmtree(trees / 'serial')
+            shutil.rmtree(trees / 'parallel')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import io
+import json
+import os
+import tempfile
+
+import github_event
+from github_event import EventReader
+
+BODY = '## 🟢 New package registration form\r\n\r\n- **Repository:** Sample/sample\r\n- **Domain:** "quoted" \\ {braces} [brackets]'
+
+
+def event(body) -> dict:
+    return {
+        'action': 'edited',
+        'changes': {'body': {'from': 'an older body, with "quotes", {braces} and [brackets]'}},
+        'issue': {
+            'id': 1,
+            'labels': [{'name': 'a,b', 'default': False}, {'name': '}'}],
+            'locked': False,
+            'milestone': None,
+            'number': 1.5e3,
+            'body': body,
+            'title': 'New package',
+        },
+        'repository': {'name': 'GithubPyPI', 'topics': ['x'] * 1000},
+    }
+
+
+def find(document: str, *keys: str, chunk_size: int = github_event.CHUNK_SIZE):
+    return EventReader(io.StringIO(document), chunk_size).find(*keys)
+
+
+def main():
+    for indent in (None, 2):
+        document = json.dumps(event(BODY), indent=indent, ensure_ascii=False)
+        # Chunks that end anywhere, inside strings, escapes and literals
+        for chunk_size in (1, 2, 3, 7, 64, len(document)):
+            assert find(document, 'issue', 'body', chunk_size=chunk_size) == BODY
+            assert find(document, 'issue', 'labels', chunk_size=chunk_size) == event(BODY)['issue']['labels']
+            assert find(document, 'issue', 'number', chunk_size=chunk_size) == 1.5e3
+            assert find(document, 'issue', 'locked', chunk_size=chunk_size) is False
+
+    assert find(json.dumps(event(None)), 'issue', 'body') is None
+    try:
+        find(json.dumps(event(BODY)), 'issue', 'assignee')
+    except KeyError:
+        pass
+    else:
+        assert False, 'Missing keys raise KeyError'
+
+    # Stops reading once it has the body, before the repository
+    file = io.StringIO(json.dumps(event(BODY)))
+    EventReader(file, 64).find('issue', 'body')
+    assert file.tell() < len(file.getvalue()) / 2, file.tell()
+
+    with tempfile.TemporaryDirectory() as temp:
+        path = os.path.join(temp, 'event.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(event(BODY), file)
+        os.environ['GITHUB_EVENT_PATH'] = path
+        try:
+            assert github_event.issue_body() == BODY
+        finally:
+            del os.environ['GITHUB_EVENT_PATH']
+
+    os.environ['GITHUB_CONTEXT'] = json.dumps({'event': event(None)})
+    assert github_event.issue_body() == ''
+
+
+if __name__ == '__main__':
+    main()
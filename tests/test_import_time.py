@@ -0,0 +1,45 @@
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).parent.parent / '.github'
+
+# Only needed once the issue form is valid
+HEAVY = ('add_packages', 'generate_site', 'warehub', 'requests', 'readme_renderer', 'packaging', 'asyncio')
+
+# Cumulative import time of run_warehub, in microseconds
+BUDGET = 50_000
+RUNS = 3
+
+
+def import_times(module: str) -> dict[str, int]:
+    """The cumulative import time of every module imported by ``module``, from ``python -X importtime``."""
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SCRIPTS,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    times = import_times('run_warehub')
+    heavy = sorted({m.split('.')[0] for m in times} & set(HEAVY))
+    assert heavy == [], f'run_warehub imports {heavy} before the form is parsed'
+
+    # The best of a few runs, so a busy machine does not fail the test
+    best = min(import_times('run_warehub')['run_warehub'] for _ in range(RUNS))
+    assert best < BUDGET, f'Importing run_warehub took {best / 1000:.1f} ms, more than {BUDGET / 1000:.0f} ms'
+
+
+if __name__ == '__main__':
+    main()
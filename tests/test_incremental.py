@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import fake_github
+import generate_site
+from fake_github import Repository
+from generate_site import PROJECT_DIRECTORIES
+
+# Only describe the run that wrote them
+RUN_FILES = ('.cache/manifest.json',)
+
+
+class Messages(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+
+def tree(root: Path) -> dict[str, bytes]:
+    files = {f.relative_to(root).as_posix(): f for f in sorted(root.rglob('*')) if f.is_file()}
+    return {n: f.read_bytes() for n, f in files.items() if n not in RUN_FILES and not n.startswith('downloads/')}
+
+
+def main():
+    repositories = [Repository(f'Sample/sample-{i}', releases=2) for i in range(3)]
+    changed = repositories[1]
+    with fake_github.site(repositories) as site, tempfile.TemporaryDirectory() as temp:
+        site.add(*(r.name for r in repositories))
+
+        # Only the project with a new release is rendered and written again
+        changed.releases += 1
+        handler = Messages()
+        logging.getLogger('warehub').addHandler(handler)
+        try:
+            site.add(changed.name)
+        finally:
+            logging.getLogger('warehub').removeHandler(handler)
+        assert 'Generating pages of 1 of 3 projects' in handler.messages, handler.messages
+        written = json.loads(Path('.cache', 'manifest.json').read_text())['written']
+        for repository in repositories:
+            name = repository.name.split('/')[1]
+            pages = [p for p in written if any(p.startswith(f'{d}/{name}/') for d in PROJECT_DIRECTORIES)]
+            assert (len(pages) > 0) == (repository is changed), (name, written)
+
+        # And the site is the same as one rendered from scratch
+        incremental = tree(site.path)
+        full = Path(temp, 'full')
+        shutil.copytree(site.path, full, ignore=shutil.ignore_patterns('downloads'))
+        os.chdir(full)
+        try:
+            generate_site.generate(['--full'])
+        finally:
+            os.chdir(site.path)
+        rebuilt = tree(full)
+        assert incremental.keys() == rebuilt.keys(), sorted(incremental.keys() ^ rebuilt.keys())
+        different = sorted(n for n in incremental if incremental[n] != rebuilt[n])
+        assert not different, different
+
+
+if __name__ == '__main__':
+    main()
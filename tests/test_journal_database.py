@@ -0,0 +1,109 @@
+import hashlib
+import json
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from warehub.database import Database
+
+import fake_github
+import journal_database
+from fake_github import Repository
+from journal_database import Journal
+
+
+class Paused(Journal):
+    """A journal whose compaction waits until it is resumed."""
+
+    def __init__(self, file: Path, compact_size: int):
+        super().__init__(file, compact_size)
+        self.resume: threading.Event = threading.Event()
+
+    def compact(self, *args) -> None:
+        self.resume.wait()
+        super().compact(*args)
+
+
+def commit(journal: Journal, data: dict, table: str, *ids: str) -> None:
+    data['last_commit'] = datetime.now()
+    journal.touch(table, list(ids))
+    journal.append(data)
+
+
+def snapshot(file: Path) -> dict:
+    return json.loads(file.read_text(), object_hook=Database._decode)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp:
+        file = Path(temp, 'data.json')
+        file.write_text(json.dumps({
+            'last_commit': datetime(2020, 1, 1),
+            'project': {'1': {'id': 1, 'name': 'sample'}, '2': {'id': 2, 'name': 'other'}},
+        }, default=Database._encode))
+
+        # The journal is replayed over the database file
+        journal = Journal(file)
+        data = journal.load()
+        data['project']['2']['name'] = 'renamed'
+        data['project']['3'] = {'id': 3, 'name': 'new'}
+        data['release'] = {'1': {'id': 1, 'project_id': 3, 'version': '1.0'}}
+        commit(journal, data, 'project', '2', '3')
+        commit(journal, data, 'release', '1')
+        # Only the changed entries are written
+        lines = journal.file.read_text().splitlines()
+        assert len(lines) == 5, lines
+        assert snapshot(file)['project']['2']['name'] == 'other'
+        assert Journal(file).load() == data
+
+        # A last line cut off while being written is ignored
+        with journal.file.open('a') as fp:
+            fp.write('{"table": "project", "id": "4", "entr')
+        assert Journal(file).load() == data
+        journal.file.write_text('\n'.join(lines) + '\n')
+
+        # Commits made while the journal is folded back are kept
+        journal = Paused(file, compact_size=1)
+        data = journal.load()
+        data['project']['4'] = {'id': 4, 'name': 'compacted'}
+        commit(journal, data, 'project', '4')
+        assert journal.compaction is not None and journal.compaction.is_alive()
+        data['project']['5'] = {'id': 5, 'name': 'during'}
+        commit(journal, data, 'project', '5')
+        journal.resume.set()
+        journal.compaction.join()
+
+        folded = snapshot(file)
+        assert folded['project']['4']['name'] == 'compacted', folded
+        assert '5' not in folded['project'], folded
+        assert 'during' in journal.file.read_text()
+        assert 'compacted' not in journal.file.read_text()
+        assert Journal(file).load() == data
+
+        # The rest is folded back as well
+        journal_database.compact(file)
+        assert journal.file.read_text() == ''
+        assert snapshot(file) == data
+        assert Journal(file).load() == data
+
+    # Files changed by add are journaled, also when they were read before
+    # the commit of another file
+    repository = Repository('Sample/sample', releases=1, assets=3)
+    with fake_github.site([repository]) as site:
+        site.add('--no-generate', repository.name)
+        repository.revision += 1
+        repository.updated_at = '2030-01-01T00:00:00Z'
+        site.add('--no-generate', repository.name)
+
+        files = Journal(Path('data.json')).load()['file']
+        assert len(files) == 3, files
+        for asset in range(repository.assets):
+            data = site.github.asset_data(repository, 0, asset)
+            (file,) = (f for f in files.values() if f.name == repository.filename(0, asset))
+            assert Path('files', file.name).read_bytes() == data, file.name
+            assert (file.size, file.sha256_digest) == (len(data), hashlib.sha256(data).hexdigest()), file.name
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import fake_github
+from fake_github import Repository, Site
+
+
+def describe(site: Site, repository: Repository) -> dict:
+    site.add('--metadata-only', repository.name)
+    return json.loads(Path('.cache', 'metadata.json').read_text())
+
+
+def main():
+    repository = Repository('Sample/sample', releases=2, assets=2)
+    with fake_github.site([repository]) as site:
+        github = site.github
+
+        report = describe(site, repository)
+        assert len(report) == 4, report
+        for name, entry in report.items():
+            assert entry['repository'] == repository.name, entry
+            assert entry['url'].startswith(github.domain), entry
+            assert entry['metadata']['Version'] in name, entry
+            assert entry['metadata']['Name'] == 'sample', entry
+            assert entry['metadata']['Requires-Python'] == '>=3.8', entry
+        # Nothing is added
+        assert not any(Path('files').iterdir())
+
+        # Only the files that are not in the report yet are read
+        repository.releases += 1
+        github.requests.clear()
+        report = describe(site, repository)
+        assert len(report) == 6, report
+        downloaded = {path.rsplit('/', 1)[-1] for host, path, _ in github.requests if host == 'assets'}
+        assert len(downloaded) == 2, github.requests
+
+        # Files that changed since are read again
+        repository.revision += 1
+        repository.updated_at = '2030-01-01T00:00:00Z'
+        github.requests.clear()
+        describe(site, repository)
+        downloaded = {path for host, path, _ in github.requests if host == 'assets'}
+        assert len(downloaded) == 6, github.requests
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import logging
+from pathlib import Path
+
+import fake_github
+from fake_github import Repository, Site
+
+
+class Messages(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+
+def plan(site: Site, repository: Repository) -> str:
+    handler = Messages()
+    logging.getLogger('warehub').addHandler(handler)
+    try:
+        site.add('--plan', repository.name)
+    finally:
+        logging.getLogger('warehub').removeHandler(handler)
+    return next(m for m in handler.messages if m.startswith('Plan: '))
+
+
+def main():
+    repository = Repository('Sample/sample', releases=3, assets=2)
+    with fake_github.site([repository]) as site:
+        github = site.github
+
+        summary = plan(site, repository)
+        assert summary.startswith('Plan: 6 new, 0 changed and 0 unchanged files'), summary
+        assert 'API calls: about 7, 1 to list the releases' in summary, summary
+        assert all(host == 'api' and status == 200 for host, _, status in github.requests), github.requests
+        # Nothing is kept, so the next run adds everything
+        assert not Path('.cache', 'releases.json').exists()
+        assert not any(Path('files').iterdir())
+
+        site.add(repository.name)
+
+        repository.releases += 1
+        summary = plan(site, repository)
+        assert summary.startswith('Plan: 2 new, 0 changed and 6 unchanged files'), summary
+
+        repository.releases -= 1
+        repository.revision += 1
+        repository.updated_at = '2030-01-01T00:00:00Z'
+        summary = plan(site, repository)
+        assert summary.startswith('Plan: 0 new, 6 changed and 0 unchanged files'), summary
+
+
+if __name__ == '__main__':
+    main()
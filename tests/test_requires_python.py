@@ -0,0 +1,35 @@
+import json
+from pathlib import Path
+
+from warehub.database import Database
+from warehub.model import Release
+
+import fake_github
+from fake_github import Repository
+
+
+def main():
+    sample = Repository('Sample/sample', requires_python='>=3.8')
+    other = Repository('Sample/other', requires_python=None)
+    with fake_github.site([sample, other]) as site:
+        site.add(sample.name, other.name)
+
+        requires_python = sorted((r.requires_python for r in Database.get(Release)), key=str)
+        assert requires_python == ['>=3.8', None], requires_python
+
+        page = Path('simple', 'sample', 'index.html').read_text()
+        assert 'data-requires-python="&gt;=3.8"' in page, page
+        (entry,) = json.loads(Path('simple', 'sample', 'index.json').read_text())['files']
+        assert entry['requires-python'] == '>=3.8', entry
+        info = json.loads(Path('pypi', 'sample', 'json', 'index.json').read_text())['info']
+        assert info['requires_python'] == '>=3.8', info
+
+        # Files that do not declare one are added without it
+        page = Path('simple', 'other', 'index.html').read_text()
+        assert 'data-requires-python' not in page, page
+        (entry,) = json.loads(Path('simple', 'other', 'index.json').read_text())['files']
+        assert 'requires-python' not in entry, entry
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+import fake_github
+import generate_site
+import wheel_metadata
+from fake_github import Repository
+
+
+def main():
+    repositories = [Repository('Sample/sample'), Repository('Sample/other')]
+    with fake_github.site(repositories) as site:
+        site.add('--no-generate', *(r.name for r in repositories))
+
+        # Wheels added before metadata files were written get one, in the
+        # workers as well, like every other file of the site
+        sidecars = sorted(wheel_metadata.sidecar(w) for w in Path('files').glob('*.whl'))
+        assert len(sidecars) == 2, sidecars
+        for sidecar in sidecars:
+            sidecar.unlink()
+        generate_site.generate(['--jobs', '2'])
+
+        written = json.loads(Path('.cache', 'manifest.json').read_text())['written']
+        for sidecar in sidecars:
+            assert sidecar.exists(), sidecar
+            assert sidecar.as_posix() in written, written
+            page = Path('simple', sidecar.name.split('-')[0], 'index.html').read_text()
+            assert 'data-core-metadata="sha256=' in page, page
+        assert not any(Path('files').glob('.*.tmp')), list(Path('files').iterdir())
+
+
+if __name__ == '__main__':
+    main()
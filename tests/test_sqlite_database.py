@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from warehub.database import Database
+from warehub.model import Project, Release
+
+import fake_github
+import journal_database
+import sqlite_database
+from fake_github import Repository
+
+
+def main():
+    other = Repository('Sample/other', releases=20, assets=2)
+    sample = Repository('Sample/sample', releases=1, assets=2)
+    with fake_github.site([other, sample], database='data.sqlite') as site:
+        site.add('--no-generate', other.name)
+        site.add('--no-generate', sample.name)
+
+        # Only the rows of the added files, their releases and their project were read
+        tables = Database._data.tables
+        for name, loaded in (('project', 1), ('release', 2), ('file', 2), ('filename', 2)):
+            assert not tables[name].complete, name
+            assert len(tables[name].entries) == loaded, (name, len(tables[name].entries))
+
+        (project,) = Database.get(Project, where=Project.name == 'sample')
+        assert project.total_size > 0
+        assert len(Database.get(Release, where=Release.project_id == project.id)) == 2
+        assert not tables['project'].complete
+
+        # Queries on fields that are not indexed still see every row
+        assert len(Database.get(Release, where=Release.summary == 'A sample package')) == 42
+        assert tables['release'].complete
+
+    # A new JSON site only has a journal, which is imported all the same
+    with fake_github.site([sample]) as site:
+        site.add('--no-generate', sample.name)
+        assert not Path('data.json').exists()
+        added = journal_database.Journal(Path('data.json')).load()
+
+        sqlite_database.import_json(Path('data.json'), Path('data.sqlite'))
+        sqlite_database.export_json(Path('data.sqlite'), Path('data.json'))
+        assert not Path('data.journal.jsonl').exists()
+        assert journal_database.Journal(Path('data.json')).load() == added
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from warehub.model import Template
+
+import fake_github
+import generate_site
+import static_assets
+from fake_github import Repository
+
+
+class Unavailable(BaseHTTPRequestHandler):
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        Unavailable.requests += 1
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Unavailable)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/logo.svg'
+
+    with tempfile.TemporaryDirectory() as temp:
+        cache = Path(temp)
+        assert static_assets.fetch_image(url, cache) is None
+        # The failure is remembered, and only tried again once it is old
+        assert static_assets.fetch_image(url, cache) is None
+        assert Unavailable.requests == 1, Unavailable.requests
+
+        (failed,) = cache.glob(f'*/{static_assets.FAILED}')
+        stale = failed.stat().st_mtime - static_assets.RETRY_AFTER - 1
+        os.utime(failed, (stale, stale))
+        assert static_assets.fetch_image(url, cache) is None
+        assert Unavailable.requests == 2, Unavailable.requests
+    server.shutdown()
+    server.server_close()
+
+    # Google Fonts stays linked unless the fonts are served with the site or
+    # left to the system
+    assert 'fonts.googleapis.com' in Template.HOMEPAGE
+    for google_fonts in (False, True):
+        template = static_assets.self_hosted(Template.HOMEPAGE, 'site.css', google_fonts)
+        assert ('fonts.googleapis.com' in template) == google_fonts, google_fonts
+        assert 'skeleton' not in template
+
+    with fake_github.site([Repository('Sample/sample')]) as site:
+        site.add('Sample/sample')
+        assert 'fonts.googleapis.com' in Path('index.html').read_text()
+
+        # Later runs, like the ones of add, keep the choice
+        for args in (['--fonts', 'system'], []):
+            generate_site.generate(args)
+            for page in ('index.html', 'simple/index.html', 'project/sample/index.html'):
+                assert 'fonts.googleapis.com' not in Path(page).read_text(), (args, page)
+
+        generate_site.generate(['--fonts', 'google'])
+        assert 'fonts.googleapis.com' in Path('index.html').read_text()
+
+
+if __name__ == '__main__':
+    main()
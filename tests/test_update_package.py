@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import fake_github
+from fake_github import Repository
+from journal_database import Journal
+
+
+def reupload(repository: Repository, updated_at: str) -> None:
+    repository.revision += 1
+    repository.updated_at = updated_at
+
+
+def check(repository: Repository) -> dict:
+    # Read back from disk, as the next run would
+    data = Journal(Path('data.json')).load()
+    (project,) = data['project'].values()
+    on_disk = sum(f.stat().st_size for f in Path('files').iterdir() if f.suffix in ('.whl', '.asc'))
+    assert project.total_size == on_disk, (project.total_size, on_disk)
+
+    files = data['file'].values()
+    assert len(files) == repository.assets, files
+    assert all(f.has_signature == repository.signed for f in files), files
+    return data
+
+
+def main():
+    repository = Repository('Sample/sample', releases=1, assets=2)
+    with fake_github.site([repository]) as site:
+        site.add('--no-generate', repository.name)
+        check(repository)
+
+        # Re-uploaded with a signature, which is counted and whose name is taken
+        repository.signed = True
+        reupload(repository, '2030-01-01T00:00:00Z')
+        site.add('--no-generate', repository.name)
+        data = check(repository)
+        names = {f.name for f in data['filename'].values()}
+        for asset in range(repository.files):
+            assert repository.asset_name(0, asset) in names, names
+
+        # Replacing a signed file counts the signature it replaces
+        reupload(repository, '2031-01-01T00:00:00Z')
+        site.add('--no-generate', repository.name)
+        check(repository)
+
+
+if __name__ == '__main__':
+    main()